@@ -16,6 +16,7 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
+import re
 
 # Import routing components
 from intelligent_source_router import IntelligentSourceRouter
@@ -50,12 +51,12 @@ def extract_text_from_pdf(pdf_file):
     """Extract text from PDF file"""
     try:
         pdf_reader = PdfReader(pdf_file)
-        text = ""
+        parts = []
         for page_num, page in enumerate(pdf_reader.pages):
             page_text = page.extract_text()
             if page_text:
-                text += f"\n[Page {page_num + 1}]\n{page_text}"
-        return text
+                parts.append(f"\n[Page {page_num + 1}]\n{page_text}")
+        return "".join(parts)
     except Exception as e:
         st.error(f"Error extracting PDF text: {e}")
         logger.error(f"PDF extraction error: {e}")
@@ -178,6 +179,47 @@ def initialize_source_router():
             logger.error(f"Source router initialization error: {e}")
 
 
+# Math and logic questions
+_MATH_INDICATORS = (
+    'calculate', 'compute', 'multiply', 'divide', 'add', 'subtract',
+    'what is', 'equals', '=', 'plus', 'minus', 'times',
+    'is', 'are', 'can', 'could', 'would'
+)
+
+# Self-contained query indicators (regex patterns)
+_SELF_CONTAINED_PATTERNS = (
+    # Basic math
+    r'\d+\s*[\+\-\*/]\s*\d+',  # "15 * 24"
+    r'what is \d+',  # "what is 15"
+    
+    # General knowledge that doesn't change
+    'capital of',
+    'definition of',
+    'how to',
+    'what does .* mean',
+    'synonym for',
+    'opposite of',
+    'formula for',
+    'difference between',
+    'similarity between'
+)
+
+_FACTUAL_INDICATORS = (
+    'latest', 'current', 'recent', 'today', 'this week', 'this month',
+    'news', 'breaking', 'happening',
+    'weather', 'temperature', 'forecast',
+    '2025', '2024', 'this year',
+    'how is', 'what is happening',
+    'status of', 'update on'
+)
+
+# Each list compiled once into a single case-insensitive alternation
+# (same substring semantics as the per-keyword checks, no query.lower())
+_SELF_CONTAINED_RE = re.compile('|'.join(f'(?:{p})' for p in _SELF_CONTAINED_PATTERNS), re.IGNORECASE)
+_MATH_INDICATORS_RE = re.compile('|'.join(map(re.escape, _MATH_INDICATORS)), re.IGNORECASE)
+_FACTUAL_RE = re.compile('|'.join(map(re.escape, _FACTUAL_INDICATORS)), re.IGNORECASE)
+
+
 def is_self_contained_query(query: str) -> bool:
     """
     Check if query can be answered using LLM's own knowledge
@@ -185,42 +227,13 @@ def is_self_contained_query(query: str) -> bool:
     
     Returns True if LLM can answer directly
     """
-    query_lower = query.lower()
-    
-    # Math and logic questions
-    math_indicators = [
-        'calculate', 'compute', 'multiply', 'divide', 'add', 'subtract',
-        'what is', 'equals', '=', 'plus', 'minus', 'times',
-        'is', 'are', 'can', 'could', 'would'
-    ]
-    
-    # Self-contained query indicators
-    self_contained = [
-        # Basic math
-        r'\d+\s*[\+\-\*/]\s*\d+',  # "15 * 24"
-        r'what is \d+',  # "what is 15"
-        
-        # General knowledge that doesn't change
-        'capital of',
-        'definition of',
-        'how to',
-        'what does .* mean',
-        'synonym for',
-        'opposite of',
-        'formula for',
-        'difference between',
-        'similarity between'
-    ]
-    
-    import re
-    
     # Check for mathematical expressions
-    if any(re.search(pattern, query_lower) for pattern in self_contained):
+    if _SELF_CONTAINED_RE.search(query):
         return True
     
     # Check for math indicators with numbers
     has_numbers = any(char.isdigit() for char in query)
-    if has_numbers and any(ind in query_lower for ind in math_indicators):
+    if has_numbers and _MATH_INDICATORS_RE.search(query):
         return True
     
     return False
@@ -231,18 +244,7 @@ def is_factual_query(query: str) -> bool:
     Check if query requires current/factual web information
     Returns True if web search is strongly recommended
     """
-    query_lower = query.lower()
-    
-    factual_indicators = [
-        'latest', 'current', 'recent', 'today', 'this week', 'this month',
-        'news', 'breaking', 'happening',
-        'weather', 'temperature', 'forecast',
-        '2025', '2024', 'this year',
-        'how is', 'what is happening',
-        'status of', 'update on'
-    ]
-    
-    return any(ind in query_lower for ind in factual_indicators)
+    return _FACTUAL_RE.search(query) is not None
 
 
 def generate_response_with_context(prompt: str, routing_result: Dict) -> str:
@@ -391,6 +393,8 @@ def main():
                 vectorstore = process_uploaded_files(uploaded_files)
                 if vectorstore:
                     st.session_state.vectorstore = vectorstore
+                    if st.session_state.source_router:
+                        st.session_state.source_router.cache_clear()
                     st.rerun()
 
         st.divider()
@@ -8,28 +8,179 @@ Tavily → Wikipedia → ArXiv → Google API → Bing API → Mock
 """
 
 from typing import Dict, Any, List, Optional
-from query_classifier import QueryClassifier
-from web_search_tavily import WebSearchEnhanced, HybridSearchEnhanced
+from ttl_cache import TTLCache
+from time_utils import today
+from keyword_matcher import KeywordMatcher
 import os
+import asyncio
+import copy
+import io
 import logging
+import collections
+import itertools
+import concurrent.futures
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared pool so local and web retrieval in hybrid mode run concurrently
+_HYBRID_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+# Marks a lazily created component that hasn't been built yet
+_UNSET = object()
+
+# Context separators (built once instead of on every retrieval)
+_SEP_EQ = "=" * 70 + "\n\n"
+_SEP_DASH = "-" * 70 + "\n\n"
+_SEP_DASH_SHORT = "-" * 70 + "\n"
+
+# Optional on-disk routing history (see history_db_path)
+_HISTORY_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS routing_history(
+        ts TEXT, query TEXT, datasource TEXT, reasoning TEXT, confidence REAL,
+        retrieval_type TEXT, num_sources INT, error TEXT
+    )
+"""
+_HISTORY_INSERT_SQL = "INSERT INTO routing_history VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Column order of history rows (matches the SQLite table)
+_HISTORY_FIELDS = (
+    'timestamp', 'query', 'datasource', 'reasoning', 'confidence',
+    'retrieval_type', 'num_sources', 'error'
+)
+
+# Numeric history columns live in a fixed-size structured ring buffer
+# (NumPy dtype spec); datasource is stored as a small integer code (see
+# _datasource_code)
+_HISTORY_RING_DTYPE = [
+    ('datasource', 'u1'),
+    ('confidence', 'f8'),
+    ('num_sources', 'u2')
+]
+_HISTORY_COMMIT_EVERY = 50
+
+# Process-wide client registries: routers with the same settings share one
+# classifier (and its ChatOpenAI connection pool) and one web search client
+# (and its pooled requests.Session). Both are used concurrently by routers on
+# different threads; their caches are lock-protected, and the HTTP clients
+# are only used for independent request/response calls.
+_CLASSIFIER_CACHE: Dict[tuple, Any] = {}
+_WEB_SEARCH_CACHE: Dict[int, Any] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _get_or_create_classifier(api_key: Optional[str], model: str):
+    """Return the shared QueryClassifier for (api_key, model), creating it once"""
+    key = (api_key, model)
+    with _REGISTRY_LOCK:
+        classifier = _CLASSIFIER_CACHE.get(key)
+        if classifier is None:
+            from query_classifier import QueryClassifier
+            classifier = QueryClassifier(api_key=api_key, model=model)
+            _CLASSIFIER_CACHE[key] = classifier
+        return classifier
+
+
+def _get_or_create_web_search(max_results: int):
+    """Return the shared WebSearchEnhanced for max_results, creating it once"""
+    with _REGISTRY_LOCK:
+        web_search = _WEB_SEARCH_CACHE.get(max_results)
+        if web_search is None:
+            from web_search_tavily import WebSearchEnhanced
+            web_search = WebSearchEnhanced(max_results=max_results)
+            _WEB_SEARCH_CACHE[max_results] = web_search
+        return web_search
+
+
+class _SourceRecord:
+    """Dict-style read access so records can stand in for plain source dicts"""
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+    
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+    
+    def keys(self) -> List[str]:
+        return [f.name for f in fields(self)]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class LocalSource(_SourceRecord):
+    """A retrieved chunk from the uploaded documents"""
+    source: str
+    page: Any
+    chunk: Any
+    content: str
+    type: str = 'local'
+
+
+@dataclass(slots=True)
+class WebSource(_SourceRecord):
+    """A web search result"""
+    title: str
+    url: str
+    snippet: str
+    full_content: str
+    source: str
+    result_type: str
+    type: str = 'web'
+
+
 #IntelligentSourceRouter
 class IntelligentSourceRouter:
     """
     Intelligent Source Router with Tavily Integration
     """
     
+    # Keywords for the fallback routing (classifier unavailable)
+    _WEB_KEYWORDS = frozenset([
+        'latest', 'current', 'recent', 'news', 'today', 'now', 'update',
+        '2024', '2025', 'trending', 'new', 'latest news', 'current events',
+        'breaking', 'recent developments', 'today news'
+    ])
+    
+    _LOCAL_KEYWORDS = frozenset([
+        'document', 'file', 'uploaded', 'pdf', 'image', 'my',
+        'attachment', 'what does', 'according to', 'based on'
+    ])
+    
+    _KEYWORD_MATCHER = KeywordMatcher({'web': _WEB_KEYWORDS, 'local': _LOCAL_KEYWORDS})
+    
+    # Runs the speculative web search while the classifier is deciding
+    _prefetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+    
     def __init__(
         self,
         api_key: Optional[str] = None,
         enable_web_search: bool = True,
         web_max_results: int = 5,
-        fetch_full_content: bool = True
+        fetch_full_content: bool = True,
+        cache_size: int = 512,
+        cache_ttl: float = 300.0,
+        enable_semantic_cache: bool = True,
+        semantic_threshold: float = 0.88,
+        semantic_cache_path: Optional[str] = None,
+        history_db_path: Optional[str] = None,
+        enable_speculative: bool = True,
+        history_size: int = 1000,
+        classifier_model: str = "gpt-4o-mini"
     ):
         """
         Initialize the enhanced router with Tavily
@@ -39,35 +190,162 @@ class IntelligentSourceRouter:
             enable_web_search: Whether to enable web search
             web_max_results: Maximum web search results
             fetch_full_content: Whether to fetch full page content
+            cache_size: Maximum number of routed results kept in the cache
+            cache_ttl: Seconds a cached routing result stays valid
+            enable_semantic_cache: Whether to reuse results for paraphrased queries
+            semantic_threshold: Minimum cosine similarity for a semantic cache hit
+            semantic_cache_path: Base path to persist semantic cache vectors (optional)
+            history_db_path: SQLite file to append routing history to (optional)
+            enable_speculative: Start the web search before classification finishes
+            history_size: Number of recent routing decisions kept in memory
+            classifier_model: OpenAI model used by the (shared) query classifier
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.enable_web_search = enable_web_search
         self.web_max_results = web_max_results
+        self.classifier_model = classifier_model
         self.fetch_full_content = fetch_full_content
+        self.enable_speculative = enable_speculative
         
-        # Initialize components
-        try:
-            self.query_classifier = QueryClassifier(api_key=self.api_key)
-            logger.info("✅ Query Classifier initialized")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Query Classifier: {e}")
-            self.query_classifier = None
+        # Repeat queries skip classification + retrieval entirely
+        self._result_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._docs_version = 0
+        
+        # Back-to-back searches for the same text reuse the Tavily response
+        self._search_cache = TTLCache(maxsize=256, ttl=60)
         
-        # Initialize enhanced web search with Tavily
-        if enable_web_search:
+        # Paraphrased queries are matched by embedding similarity
+        self._semantic_cache = None
+        if enable_semantic_cache:
             try:
-                self.web_search = WebSearchEnhanced(max_results=web_max_results)
-                self.hybrid_search = HybridSearchEnhanced(self.web_search)
-                logger.info("✅ Enhanced Web Search (Tavily) and Hybrid Search initialized")
+                from langchain_openai import OpenAIEmbeddings
+                from semantic_cache import SemanticCache
+                embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=self.api_key)
+                self._semantic_cache = SemanticCache(
+                    embed_fn=embeddings.embed_query,
+                    threshold=semantic_threshold,
+                    ttl=cache_ttl,
+                    persist_path=semantic_cache_path
+                )
+                logger.info("✅ Semantic query cache initialized")
             except Exception as e:
-                logger.warning(f"⚠️ Web search initialization failed: {e}")
-                self.web_search = None
-                self.hybrid_search = None
-        else:
-            self.web_search = None
-            self.hybrid_search = None
+                logger.warning(f"⚠️ Semantic cache initialization failed: {e}")
+        
+        # Components are created on first use (see the properties below), so a
+        # router that only answers local queries never builds the web clients
+        self._init_lock = threading.Lock()
+        self._query_classifier = _UNSET
+        self._web_search = _UNSET
+        self._hybrid_search = _UNSET
+        
+        # History keeps the last history_size entries: numeric columns in a
+        # NumPy ring buffer, text columns in parallel deques. The aggregate
+        # counters below cover the router's whole lifetime (evicted entries
+        # still count)
+        import numpy as np
+        history_size = max(1, history_size)
+        self._hist_ring = np.zeros(history_size, dtype=_HISTORY_RING_DTYPE)
+        self._hist_pos = 0
+        self._hist_count = 0
+        self._hist_timestamps = collections.deque(maxlen=history_size)
+        self._hist_queries = collections.deque(maxlen=history_size)
+        self._hist_reasoning = collections.deque(maxlen=history_size)
+        self._hist_retrieval_types = collections.deque(maxlen=history_size)
+        self._hist_errors = collections.deque(maxlen=history_size)
+        self._hist_append_lock = threading.Lock()
+        self._datasource_codes: Dict[str, int] = {}
+        self._datasource_names: List[str] = []
+        self._by_source = collections.Counter()
+        self._by_retrieval_type = collections.Counter()
+        self._confidence_sum = 0.0
+        self._error_count = 0
+        self._total = 0
+        
+        # Retrieval handlers share the (query, local_retriever, web_future) signature
+        self._dispatch = {
+            'local_rag': self._retrieve_local,
+            'web_search': self._retrieve_web,
+            'hybrid': self._retrieve_hybrid
+        }
         
-        self.routing_history = []
+        # Append-only SQLite history for post-hoc analytics
+        self._hist_db = None
+        self._hist_lock = threading.Lock()
+        self._hist_pending = 0
+        if history_db_path:
+            try:
+                self._hist_db = sqlite3.connect(history_db_path, check_same_thread=False)
+                self._hist_db.execute("PRAGMA journal_mode=WAL")
+                self._hist_db.execute(_HISTORY_SCHEMA_SQL)
+                self._hist_db.commit()
+                logger.info(f"✅ Routing history persisted to {history_db_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Routing history database unavailable: {e}")
+                self._hist_db = None
+    
+    @property
+    def query_classifier(self):
+        """Query classifier, created on first access (None if unavailable)"""
+        if self._query_classifier is _UNSET:
+            with self._init_lock:
+                if self._query_classifier is _UNSET:
+                    try:
+                        self._query_classifier = _get_or_create_classifier(self.api_key, self.classifier_model)
+                        logger.info("✅ Query Classifier initialized")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to initialize Query Classifier: {e}")
+                        self._query_classifier = None
+        return self._query_classifier
+    
+    @query_classifier.setter
+    def query_classifier(self, value):
+        self._query_classifier = value
+    
+    @property
+    def web_search(self):
+        """Enhanced web search (Tavily), created on first access (None if disabled/unavailable)"""
+        if self._web_search is _UNSET:
+            self._init_web_search()
+        return self._web_search
+    
+    @web_search.setter
+    def web_search(self, value):
+        self._web_search = value
+    
+    @property
+    def hybrid_search(self):
+        """Hybrid search, created together with web_search"""
+        if self._hybrid_search is _UNSET:
+            self._init_web_search()
+        return self._hybrid_search
+    
+    @hybrid_search.setter
+    def hybrid_search(self, value):
+        self._hybrid_search = value
+    
+    def _init_web_search(self):
+        """Initialize enhanced web search with Tavily (fills whichever component is unset)"""
+        with self._init_lock:
+            if self._web_search is not _UNSET and self._hybrid_search is not _UNSET:
+                return
+            
+            web_search = hybrid_search = None
+            if self.enable_web_search:
+                try:
+                    from web_search_tavily import HybridSearchEnhanced
+                    web_search = self._web_search
+                    if web_search is _UNSET:
+                        web_search = _get_or_create_web_search(self.web_max_results)
+                    hybrid_search = HybridSearchEnhanced(web_search) if web_search else None
+                    logger.info("✅ Enhanced Web Search (Tavily) and Hybrid Search initialized")
+                except Exception as e:
+                    logger.warning(f"⚠️ Web search initialization failed: {e}")
+                    web_search = hybrid_search = None
+            
+            if self._web_search is _UNSET:
+                self._web_search = web_search
+            if self._hybrid_search is _UNSET:
+                self._hybrid_search = hybrid_search
     
     def route_query(
         self,
@@ -82,6 +360,69 @@ class IntelligentSourceRouter:
         """
         logger.info(f"🔄 Routing query: {query[:50]}...")
         
+        # Retrievers are rebuilt per query, so key on the document version
+        # (bumped by cache_clear) rather than on the retriever object
+        docs_version = self._docs_version if local_retriever is not None else None
+        cache_key = (query, has_uploaded_docs, docs_version)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("⚡ Cache hit, skipping classification and retrieval")
+            result = copy.deepcopy(cached)
+            self._save_routing_history(result)
+            return result
+        
+        # Semantic lookup only without uploaded docs: those queries always route
+        # to web search, so the result doesn't depend on the local retriever
+        query_vec = None
+        if self._semantic_cache is not None and not has_uploaded_docs:
+            try:
+                query_vec = self._semantic_cache.embed(query)
+                cached = self._semantic_cache.lookup(query_vec)
+            except Exception as e:
+                logger.warning(f"⚠️ Semantic cache lookup failed: {e}")
+                cached = None
+            
+            if cached is not None:
+                logger.info("🧠 Semantic cache hit, reusing result of a similar query")
+                result = copy.deepcopy(cached)
+                result['query'] = query
+                if 'query' in result['routing']:
+                    result['routing']['query'] = query
+                self._result_cache.set(cache_key, copy.deepcopy(result))
+                self._save_routing_history(result)
+                return result
+        
+        result = self._route_query_uncached(query, local_retriever, has_uploaded_docs)
+        
+        # Only successful results are cached so transient failures get retried
+        if not result.get('error'):
+            self._result_cache.set(cache_key, copy.deepcopy(result))
+            if query_vec is not None:
+                self._semantic_cache.add(query_vec, copy.deepcopy(result))
+        
+        return result
+    
+    async def route_query_async(
+        self,
+        query: str,
+        local_retriever=None,
+        has_uploaded_docs: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Async variant of route_query for use inside an event loop
+        
+        Routing runs on a worker thread; hybrid queries already fetch local
+        and web results concurrently, so latency is max(local, web).
+        """
+        return await asyncio.to_thread(self.route_query, query, local_retriever, has_uploaded_docs)
+    
+    def _route_query_uncached(
+        self,
+        query: str,
+        local_retriever,
+        has_uploaded_docs: bool
+    ) -> Dict[str, Any]:
+        """Classify the query and run the selected retrieval path"""
         result = {
             'query': query,
             'routing': {
@@ -94,6 +435,14 @@ class IntelligentSourceRouter:
             'raw_search_results': []
         }
         
+        # The web search only needs the raw query, so start it while the
+        # classifier runs. Only without uploaded docs, where the query always
+        # routes to web: with docs the classification (rules first, so usually
+        # instant) decides before a paid search and page fetches are spent
+        fut_web = None
+        if self.enable_speculative and not has_uploaded_docs and self.web_search:
+            fut_web = self._prefetch_pool.submit(self._cached_search, query)
+        
         try:
             # Step 1: Classify query
             if self.query_classifier is None:
@@ -103,30 +452,21 @@ class IntelligentSourceRouter:
                 result['routing']['reasoning'] = "Default routing (classifier unavailable)"
                 result['routing']['confidence'] = 0.5
             else:
-                classification = self.query_classifier.classify_query(
-                    query,
-                    has_uploaded_docs
-                )
-                result['routing'] = classification
+                # The classifier caches (with a TTL, never caching fallbacks)
+                # and returns a fresh dict
+                result['routing'] = self.query_classifier.classify_query(query, has_uploaded_docs)
             
             # Step 2: Execute retrieval based on classification
             datasource = result['routing']['datasource']
             logger.info(f"📍 Selected datasource: {datasource}")
             
             # Execute appropriate retrieval method
-            if datasource == 'local_rag':
-                retrieval_result = self._retrieve_local(query, local_retriever)
-                result.update(retrieval_result)
-            elif datasource == 'web_search':
-                retrieval_result = self._retrieve_web(query)
-                result.update(retrieval_result)
-            elif datasource == 'hybrid':
-                retrieval_result = self._retrieve_hybrid(query, local_retriever)
-                result.update(retrieval_result)
-            else:
+            handler = self._dispatch.get(datasource)
+            if handler is None:
                 logger.warning(f"Unknown datasource: {datasource}, defaulting to web_search")
-                retrieval_result = self._retrieve_web(query)
-                result.update(retrieval_result)
+                handler = self._retrieve_web
+            retrieval_result = handler(query, local_retriever, fut_web)
+            result.update(retrieval_result)
             
             # Step 3: Save routing history
             self._save_routing_history(result)
@@ -134,17 +474,55 @@ class IntelligentSourceRouter:
             logger.info(f"✅ Query routed successfully to {datasource}")
             
         except Exception as e:
-            logger.error(f"❌ Routing error: {e}", exc_info=True)
+            logger.error("❌ Routing error: %s", e)
+            logger.debug("Traceback:", exc_info=True)
+            if fut_web is not None:
+                fut_web.cancel()
             result['error'] = str(e)
             result['context'] = f"Error during routing: {str(e)}"
         
         return result
     
-    def _retrieve_web(self, query: str) -> Dict[str, Any]:
+    def _cached_search(self, query: str) -> List[Dict[str, Any]]:
+        """Run search_and_extract, memoized on (query, fetch_content) for a short TTL"""
+        key = (query, self.fetch_full_content)
+        cached = self._search_cache.get(key)
+        if cached is None:
+            cached = tuple(self.web_search.search_and_extract(
+                query,
+                fetch_content=self.fetch_full_content
+            ))
+            self._search_cache.set(key, cached)
+        
+        # Result dicts are mutable, so hand out copies
+        return copy.deepcopy(list(cached))
+    
+    def cache_clear(self):
+        """
+        Drop all cached routing results
+        
+        Call this whenever the local documents change (e.g. after an upload):
+        cached results are keyed on a document version that this bumps.
+        """
+        self._docs_version += 1
+        self._result_cache.clear()
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
+    
+    def _retrieve_web(
+        self,
+        query: str,
+        local_retriever=None,
+        web_future: Optional[concurrent.futures.Future] = None
+    ) -> Dict[str, Any]:
         """
         Retrieve from web search (now with Tavily as primary)
         
         Fallback chain: Tavily → Wikipedia → ArXiv → Google → Bing → Mock
+        
+        local_retriever is unused; it keeps the signature uniform with the
+        other retrieval handlers. If web_future is given (speculative
+        prefetch), its result is used instead of issuing a new search.
         """
         logger.info("🌐 Performing enhanced web search (Tavily primary)...")
         
@@ -161,10 +539,10 @@ class IntelligentSourceRouter:
             logger.info(f"🔍 Searching for: {query}")
             
             # Use enhanced search with Tavily as primary
-            web_results = self.web_search.search_and_extract(
-                query,
-                fetch_content=self.fetch_full_content
-            )
+            if web_future is not None:
+                web_results = web_future.result()
+            else:
+                web_results = self._cached_search(query)
             
             if not web_results:
                 logger.info("ℹ️ No web search results found")
@@ -177,40 +555,38 @@ class IntelligentSourceRouter:
                 }
             
             # Build context with results
-            context = f"=== 🌐 WEB SEARCH RESULTS (Tavily Enhanced, As of {datetime.now().strftime('%B %d, %Y')}) ===\n\n"
-            context += f"Search Query: {query}\n"
-            context += "=" * 70 + "\n\n"
+            as_of = today()
+            buf = io.StringIO()
+            write = buf.write
+            write(f"=== 🌐 WEB SEARCH RESULTS (Tavily Enhanced, As of {as_of}) ===\n\n")
+            write(f"Search Query: {query}\n")
+            write(_SEP_EQ)
             
             sources = []
             
             for i, result in enumerate(web_results, 1):
-                title = result.get('title', 'Unknown')
-                url = result.get('url', '')
-                snippet = result.get('snippet', '')
-                full_content = result.get('full_content', snippet)
-                source = result.get('source', 'Web Search')
-                result_type = result.get('type', 'web')
+                g = result.get
+                title = g('title', 'Unknown')
+                url = g('url', '')
+                snippet = g('snippet', '')
+                full_content = g('full_content', snippet)
+                source = g('source', 'Web Search')
+                result_type = g('type', 'web')
                 
                 content_to_use = full_content if full_content else snippet
                 
-                context += f"[Result {i}] ({source} - {result_type})\n"
-                context += f"Title: {title}\n"
+                write(f"[Result {i}] ({source} - {result_type})\n")
+                write(f"Title: {title}\n")
                 
                 if url:
-                    context += f"URL: {url}\n"
+                    write(f"URL: {url}\n")
                 
-                context += f"Content:\n{content_to_use}\n"
-                context += "-" * 70 + "\n\n"
+                write(f"Content:\n{content_to_use}\n")
+                write(_SEP_DASH)
                 
-                sources.append({
-                    'type': 'web',
-                    'title': title,
-                    'url': url,
-                    'snippet': snippet,
-                    'full_content': content_to_use,
-                    'source': source,
-                    'result_type': result_type
-                })
+                sources.append(WebSource(title, url, snippet, content_to_use, source, result_type))
+            
+            context = buf.getvalue()
             
             logger.info(f"✅ Retrieved {len(web_results)} web search results")
             
@@ -223,7 +599,8 @@ class IntelligentSourceRouter:
             }
             
         except Exception as e:
-            logger.error(f"❌ Error performing web search: {e}", exc_info=True)
+            logger.error("❌ Error performing web search: %s", e)
+            logger.debug("Traceback:", exc_info=True)
             return {
                 'context': f'Error performing web search: {str(e)}',
                 'sources': [],
@@ -235,11 +612,15 @@ class IntelligentSourceRouter:
     def _retrieve_local(
         self,
         query: str,
-        local_retriever
+        local_retriever,
+        web_future: Optional[concurrent.futures.Future] = None
     ) -> Dict[str, Any]:
-        """Retrieve from local RAG system"""
+        """Retrieve from local RAG system (a speculative web search is discarded)"""
         logger.info("📄 Retrieving from local documents...")
         
+        if web_future is not None:
+            web_future.cancel()
+        
         if local_retriever is None:
             logger.warning("⚠️ No local retriever configured")
             return {
@@ -261,7 +642,9 @@ class IntelligentSourceRouter:
                     'num_results': 0
                 }
             
-            context = "=== 📄 LOCAL DOCUMENT RESULTS ===\n\n"
+            buf = io.StringIO()
+            write = buf.write
+            write("=== 📄 LOCAL DOCUMENT RESULTS ===\n\n")
             sources = []
             
             for i, doc in enumerate(docs, 1):
@@ -269,22 +652,18 @@ class IntelligentSourceRouter:
                 page = doc.metadata.get('page', 'N/A')
                 chunk = doc.metadata.get('chunk', 'N/A')
                 
-                context += f"[Document {i}] {source}\n"
+                write(f"[Document {i}] {source}\n")
                 
                 if page != 'N/A':
-                    context += f"Page: {page} | "
+                    write(f"Page: {page} | ")
                 if chunk != 'N/A':
-                    context += f"Chunk: {chunk}\n"
+                    write(f"Chunk: {chunk}\n")
                 
-                context += f"Content: {doc.page_content}\n\n"
+                write(f"Content: {doc.page_content}\n\n")
                 
-                sources.append({
-                    'type': 'local',
-                    'source': source,
-                    'page': page,
-                    'chunk': chunk,
-                    'content': doc.page_content
-                })
+                sources.append(LocalSource(source, page, chunk, doc.page_content))
+            
+            context = buf.getvalue()
             
             logger.info(f"✅ Retrieved {len(docs)} local documents")
             
@@ -296,7 +675,8 @@ class IntelligentSourceRouter:
             }
             
         except Exception as e:
-            logger.error(f"❌ Error retrieving local documents: {e}", exc_info=True)
+            logger.error("❌ Error retrieving local documents: %s", e)
+            logger.debug("Traceback:", exc_info=True)
             return {
                 'context': f'Error retrieving local documents: {str(e)}',
                 'sources': [],
@@ -307,112 +687,107 @@ class IntelligentSourceRouter:
     def _retrieve_hybrid(
         self,
         query: str,
-        local_retriever
+        local_retriever,
+        web_future: Optional[concurrent.futures.Future] = None
     ) -> Dict[str, Any]:
         """Retrieve from both local and web sources (with Tavily)"""
         logger.info("🔄 Performing hybrid retrieval (local + web with Tavily)...")
         
         try:
+            # Launch local and web retrieval concurrently
+            fut_local = _HYBRID_POOL.submit(local_retriever.get_relevant_documents, query) if local_retriever else None
+            fut_web = web_future
+            if fut_web is None and self.web_search:
+                fut_web = _HYBRID_POOL.submit(self._cached_search, query)
+            
             # Get local results
-            local_results = []
-            if local_retriever:
+            local_docs = []
+            if fut_local:
                 try:
-                    local_docs = local_retriever.get_relevant_documents(query)
-                    local_results = [
-                        {
-                            'source': doc.metadata.get('source', 'Unknown'),
-                            'page': doc.metadata.get('page', 'N/A'),
-                            'chunk': doc.metadata.get('chunk', 'N/A'),
-                            'content': doc.page_content
-                        }
-                        for doc in local_docs
-                    ]
-                    logger.info(f"✅ Retrieved {len(local_results)} local results")
+                    local_docs = fut_local.result(timeout=30)
+                    logger.info(f"✅ Retrieved {len(local_docs)} local results")
                 except Exception as e:
                     logger.warning(f"⚠️ Failed to retrieve local results: {e}")
             
             # Get web results (with Tavily primary)
             web_results = []
-            if self.web_search:
+            if fut_web:
                 try:
-                    web_results = self.web_search.search_and_extract(
-                        query,
-                        fetch_content=self.fetch_full_content
-                    )
+                    web_results = fut_web.result(timeout=30)
                     logger.info(f"✅ Retrieved {len(web_results)} web results")
                 except Exception as e:
                     logger.warning(f"⚠️ Failed to retrieve web results: {e}")
             
-            # Format hybrid context
-            hybrid_context = f"=== 🔄 HYBRID RETRIEVAL RESULTS (As of {datetime.now().strftime('%B %d, %Y')}) ===\n\n"
+            # Format hybrid context and collect sources in the same pass
+            as_of = today()
+            buf = io.StringIO()
+            write = buf.write
+            write(f"=== 🔄 HYBRID RETRIEVAL RESULTS (As of {as_of}) ===\n\n")
+            all_sources = []
             
             # Local section
-            hybrid_context += "📄 LOCAL DOCUMENTS:\n"
-            hybrid_context += "-" * 70 + "\n"
-            
-            if local_results:
-                for i, result in enumerate(local_results, 1):
-                    hybrid_context += f"[Local {i}] {result['source']}\n"
-                    if result['page'] != 'N/A':
-                        hybrid_context += f"Page: {result['page']} | "
-                    if result['chunk'] != 'N/A':
-                        hybrid_context += f"Chunk: {result['chunk']}\n"
-                    hybrid_context += f"Content: {result['content']}\n\n"
-            else:
-                hybrid_context += "No local documents found.\n\n"
+            write("📄 LOCAL DOCUMENTS:\n")
+            write(_SEP_DASH_SHORT)
+            
+            n_local = 0
+            for doc in local_docs:
+                n_local += 1
+                source = doc.metadata.get('source', 'Unknown')
+                page = doc.metadata.get('page', 'N/A')
+                chunk = doc.metadata.get('chunk', 'N/A')
+                content = doc.page_content
+                
+                write(f"[Local {n_local}] {source}\n")
+                if page != 'N/A':
+                    write(f"Page: {page} | ")
+                if chunk != 'N/A':
+                    write(f"Chunk: {chunk}\n")
+                write(f"Content: {content}\n\n")
+                
+                all_sources.append(LocalSource(source, page, chunk, content))
+            
+            if not n_local:
+                write("No local documents found.\n\n")
             
             # Web section
-            hybrid_context += "\n🌐 WEB SEARCH RESULTS (Tavily Enhanced):\n"
-            hybrid_context += "-" * 70 + "\n"
-            
-            if web_results:
-                for i, result in enumerate(web_results, 1):
-                    title = result.get('title', 'Unknown')
-                    url = result.get('url', '')
-                    content = result.get('full_content', result.get('snippet', ''))
-                    source = result.get('source', 'Web Search')
-                    
-                    hybrid_context += f"[Web {i}] {title} ({source})\n"
-                    if url:
-                        hybrid_context += f"URL: {url}\n"
-                    hybrid_context += f"Content: {content}\n\n"
-            else:
-                hybrid_context += "No web results found.\n\n"
+            write("\n🌐 WEB SEARCH RESULTS (Tavily Enhanced):\n")
+            write(_SEP_DASH_SHORT)
             
-            # Combine sources
-            all_sources = []
-            for result in local_results:
-                all_sources.append({
-                    'type': 'local',
-                    'source': result['source'],
-                    'page': result['page'],
-                    'chunk': result['chunk'],
-                    'content': result['content']
-                })
-            
-            for result in web_results:
-                all_sources.append({
-                    'type': 'web',
-                    'title': result.get('title', 'Unknown'),
-                    'url': result.get('url', ''),
-                    'content': result.get('full_content', result.get('snippet', '')),
-                    'source': result.get('source', 'Web Search')
-                })
-            
-            logger.info(f"✅ Hybrid retrieval: {len(local_results)} local + {len(web_results)} web")
+            for i, result in enumerate(web_results, 1):
+                g = result.get
+                title = g('title', 'Unknown')
+                url = g('url', '')
+                snippet = g('snippet', '')
+                content = g('full_content', snippet)
+                source = g('source', 'Web Search')
+                
+                write(f"[Web {i}] {title} ({source})\n")
+                if url:
+                    write(f"URL: {url}\n")
+                write(f"Content: {content}\n\n")
+                
+                all_sources.append(WebSource(title, url, snippet, content, source, g('type', 'web')))
+            
+            if not web_results:
+                write("No web results found.\n\n")
+            
+            hybrid_context = buf.getvalue()
+            
+            logger.info(f"✅ Hybrid retrieval: {n_local} local + {len(web_results)} web")
             
             return {
                 'context': hybrid_context,
                 'sources': all_sources,
                 'retrieval_type': 'hybrid',
-                'num_local_results': len(local_results),
+                'num_local_results': n_local,
                 'num_web_results': len(web_results),
-                'total_results': len(local_results) + len(web_results),
+                'total_results': n_local + len(web_results),
                 'raw_search_results': web_results
             }
             
         except Exception as e:
-            logger.error(f"❌ Error in hybrid retrieval: {e}", exc_info=True)
+            logger.error("❌ Error in hybrid retrieval: %s", e)
+            logger.debug("Traceback:", exc_info=True)
             return {
                 'context': f'Error in hybrid retrieval: {str(e)}',
                 'sources': [],
@@ -423,21 +798,10 @@ class IntelligentSourceRouter:
     
     def _fallback_datasource_selection(self, has_uploaded_docs: bool, query: str) -> str:
         """Fallback keyword-based routing"""
-        query_lower = query.lower()
-        
-        web_keywords = [
-            'latest', 'current', 'recent', 'news', 'today', 'now', 'update',
-            '2024', '2025', 'trending', 'new', 'latest news', 'current events',
-            'breaking', 'recent developments', 'today news'
-        ]
-        
-        local_keywords = [
-            'document', 'file', 'uploaded', 'pdf', 'image', 'my',
-            'attachment', 'what does', 'according to', 'based on'
-        ]
-        
-        has_web_intent = any(kw in query_lower for kw in web_keywords)
-        has_local_intent = any(kw in query_lower for kw in local_keywords)
+        # Single pass over the query for both keyword groups
+        hits = self._KEYWORD_MATCHER.tags(query.lower())
+        has_web_intent = 'web' in hits
+        has_local_intent = 'local' in hits
         
         if has_web_intent and has_local_intent and has_uploaded_docs:
             return 'hybrid'
@@ -449,75 +813,238 @@ class IntelligentSourceRouter:
     def _save_routing_history(self, result: Dict[str, Any]):
         """Save routing decision to history"""
         try:
-            history_entry = {
-                'query': result.get('query', ''),
-                'datasource': result.get('routing', {}).get('datasource', 'unknown'),
-                'reasoning': result.get('routing', {}).get('reasoning', ''),
-                'confidence': result.get('routing', {}).get('confidence', 0),
-                'retrieval_type': result.get('retrieval_type', 'unknown'),
-                'num_sources': len(result.get('sources', [])),
-                'error': result.get('error', None),
-                'timestamp': datetime.now().isoformat()
-            }
+            # route_query and every _retrieve_* method fill these keys; only 'error' is optional
+            routing = result['routing']
+            datasource = routing['datasource']
+            confidence = routing['confidence']
+            retrieval_type = result['retrieval_type']
+            error = result.get('error')
+            row = (
+                datetime.now().isoformat(), result['query'], datasource, routing['reasoning'],
+                confidence, retrieval_type, len(result['sources']), error
+            )
+            
+            with self._hist_append_lock:
+                self._hist_ring[self._hist_pos] = (
+                    self._datasource_code(datasource), confidence, min(row[6], 0xFFFF)
+                )
+                self._hist_pos = (self._hist_pos + 1) % len(self._hist_ring)
+                self._hist_count = min(self._hist_count + 1, len(self._hist_ring))
+                self._hist_timestamps.append(row[0])
+                self._hist_queries.append(row[1])
+                self._hist_reasoning.append(row[3])
+                self._hist_retrieval_types.append(retrieval_type)
+                self._hist_errors.append(error)
+                
+                self._total += 1
+                self._by_source[datasource] += 1
+                self._by_retrieval_type[retrieval_type] += 1
+                self._confidence_sum += confidence
+                if error:
+                    self._error_count += 1
+            
+            if self._hist_db is not None:
+                self._persist_history_entry(row)
             
-            self.routing_history.append(history_entry)
-            logger.debug(f"📊 Routing history saved: {history_entry['datasource']}")
+            logger.debug(f"📊 Routing history saved: {datasource}")
         except Exception as e:
             logger.error(f"Error saving routing history: {e}")
     
-    def get_routing_stats(self) -> Dict[str, Any]:
-        """Get statistics about routing decisions"""
-        if not self.routing_history:
+    def _datasource_code(self, datasource: str) -> int:
+        """Map a datasource name to its ring buffer code (assigned on first sight)"""
+        code = self._datasource_codes.get(datasource)
+        if code is None:
+            code = len(self._datasource_names)
+            self._datasource_codes[datasource] = code
+            self._datasource_names.append(datasource)
+        return code
+    
+    def _history_rows(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rebuild the last n (default: all) history entries as dicts, oldest first"""
+        with self._hist_append_lock:
+            count = self._hist_count
+            if count < len(self._hist_ring):
+                ring = self._hist_ring[:count]
+            else:
+                import numpy as np
+                ring = np.concatenate((self._hist_ring[self._hist_pos:], self._hist_ring[:self._hist_pos]))
+            start = 0 if n is None else max(0, count - n)
+            texts = zip(*(
+                itertools.islice(column, start, None) for column in (
+                    self._hist_timestamps, self._hist_queries, self._hist_reasoning,
+                    self._hist_retrieval_types, self._hist_errors
+                )
+            ))
+            names = self._datasource_names
+            return [
+                dict(zip(_HISTORY_FIELDS, (
+                    timestamp, query, names[code], reasoning, confidence,
+                    retrieval_type, num_sources, error
+                )))
+                for (timestamp, query, reasoning, retrieval_type, error), (code, confidence, num_sources)
+                in zip(texts, ring[start:].tolist())
+            ]
+    
+    def _recent_stats(self) -> Dict[str, Any]:
+        """Vectorized stats over the entries currently in the history window"""
+        ring = self._hist_ring[:self._hist_count]
+        if not len(ring):
+            return {'window': 0, 'by_source': {}, 'avg_confidence': 0.0}
+        import numpy as np
+        counts = np.bincount(ring['datasource'], minlength=len(self._datasource_names))
+        return {
+            'window': len(ring),
+            'by_source': {name: int(c) for name, c in zip(self._datasource_names, counts) if c},
+            'avg_confidence': float(ring['confidence'].mean())
+        }
+    
+    def _persist_history_entry(self, row: tuple):
+        """Append a history row (in _HISTORY_FIELDS order) to SQLite, committing in batches"""
+        with self._hist_lock:
+            self._hist_db.execute(_HISTORY_INSERT_SQL, row)
+            self._hist_pending += 1
+            if self._hist_pending >= _HISTORY_COMMIT_EVERY:
+                self._hist_db.commit()
+                self._hist_pending = 0
+    
+    def get_persisted_stats(self) -> Dict[str, Any]:
+        """Get routing statistics over the full on-disk history"""
+        if self._hist_db is None:
+            return {}
+        
+        with self._hist_lock:
+            total, avg_confidence, error_count = self._hist_db.execute(
+                "SELECT COUNT(*), AVG(confidence), COUNT(error) FROM routing_history"
+            ).fetchone()
+            by_source = self._hist_db.execute(
+                "SELECT datasource, COUNT(*) FROM routing_history GROUP BY datasource"
+            ).fetchall()
+            by_retrieval_type = self._hist_db.execute(
+                "SELECT retrieval_type, COUNT(*) FROM routing_history GROUP BY retrieval_type"
+            ).fetchall()
+        
+        return {
+            'total_queries': total,
+            'by_source': dict(by_source),
+            'by_retrieval_type': dict(by_retrieval_type),
+            'avg_confidence': avg_confidence or 0.0,
+            'error_count': error_count
+        }
+    
+    def close(self):
+        """Flush and close the routing history database"""
+        if self._hist_db is None:
+            return
+        with self._hist_lock:
+            self._hist_db.commit()
+            self._hist_db.close()
+            self._hist_db = None
+    
+    @property
+    def routing_history(self) -> List[Dict[str, Any]]:
+        """Recent routing decisions as dicts (built on demand from the columns)"""
+        return self._history_rows()
+    
+    def get_recent_history(self, n: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the most recent routing decisions, oldest first
+        
+        Args:
+            n: Maximum number of entries to return
+        """
+        return self._history_rows(max(0, n))
+    
+    def get_routing_stats(self, include_history: bool = False) -> Dict[str, Any]:
+        """
+        Get statistics about routing decisions
+        
+        Args:
+            include_history: Whether to include the recent history as a list of dicts
+        """
+        cache_info = self._result_cache.info()
+        # Read the classifier's own cache without triggering its lazy init
+        classifier = self._query_classifier
+        if classifier is _UNSET or classifier is None:
+            classify_info = {'hits': 0, 'misses': 0}
+        else:
+            classify_info = classifier.cache.stats()
+        
+        if not self._total:
             return {
                 'total_queries': 0,
                 'by_source': {},
                 'by_retrieval_type': {},
                 'avg_confidence': 0.0,
-                'error_count': 0
+                'error_count': 0,
+                'cache_hits': cache_info['hits'],
+                'cache_misses': cache_info['misses'],
+                'classifier_cache_hits': classify_info['hits'],
+                'classifier_cache_misses': classify_info['misses'],
+                'semantic_cache': self._semantic_cache.info() if self._semantic_cache else None
             }
         
-        total = len(self.routing_history)
-        by_source = {}
-        by_retrieval_type = {}
-        total_confidence = 0.0
-        error_count = 0
-        
-        for entry in self.routing_history:
-            source = entry['datasource']
-            by_source[source] = by_source.get(source, 0) + 1
-            
-            ret_type = entry.get('retrieval_type', 'unknown')
-            by_retrieval_type[ret_type] = by_retrieval_type.get(ret_type, 0) + 1
-            
-            total_confidence += entry['confidence']
-            
-            if entry.get('error'):
-                error_count += 1
+        # Lifetime aggregates are maintained incrementally in _save_routing_history
+        total = self._total
         
         return {
             'total_queries': total,
-            'by_source': by_source,
-            'by_retrieval_type': by_retrieval_type,
-            'avg_confidence': total_confidence / total if total > 0 else 0.0,
-            'error_count': error_count,
-            'success_rate': (total - error_count) / total if total > 0 else 0.0,
-            'routing_history': self.routing_history
+            'by_source': dict(self._by_source),
+            'by_retrieval_type': dict(self._by_retrieval_type),
+            'avg_confidence': self._confidence_sum / total,
+            'error_count': self._error_count,
+            'success_rate': (total - self._error_count) / total,
+            'cache_hits': cache_info['hits'],
+            'cache_misses': cache_info['misses'],
+            'classifier_cache_hits': classify_info['hits'],
+            'classifier_cache_misses': classify_info['misses'],
+            'semantic_cache': self._semantic_cache.info() if self._semantic_cache else None,
+            'recent': self._recent_stats(),
+            'routing_history': self.routing_history if include_history else None
         }
 
 
 # ==================== TEST ====================
 
+class _MockWebSearch:
+    """Offline stand-in for WebSearchEnhanced (ROUTER_TEST_MODE=mock)"""
+    
+    def search_and_extract(self, query: str, fetch_content: bool = False) -> List[Dict[str, Any]]:
+        return [
+            {
+                'title': f"Mock result {i} for {query}",
+                'url': f"https://example.com/mock/{i}",
+                'snippet': f"Snippet {i} about {query}",
+                'full_content': f"Full content {i} about {query}",
+                'source': 'Mock',
+                'type': 'web'
+            }
+            for i in range(1, 4)
+        ]
+
+
 if __name__ == "__main__":
+    mock_mode = os.getenv('ROUTER_TEST_MODE') == 'mock'
+    
     print("=" * 80)
-    print("ENHANCED INTELLIGENT ROUTER - TAVILY TEST")
+    print(f"ENHANCED INTELLIGENT ROUTER - {'MOCK' if mock_mode else 'TAVILY'} TEST")
     print("=" * 80)
     
     try:
-        router = IntelligentSourceRouterTavily(
-            enable_web_search=True,
-            web_max_results=3,
-            fetch_full_content=True
-        )
+        if mock_mode:
+            # No network: fallback routing plus canned web results
+            router = IntelligentSourceRouter(
+                enable_web_search=False,
+                enable_semantic_cache=False
+            )
+            router.query_classifier = None
+            router.web_search = _MockWebSearch()
+            router.hybrid_search = None
+        else:
+            router = IntelligentSourceRouter(
+                enable_web_search=True,
+                web_max_results=3,
+                fetch_full_content=True
+            )
         
         test_queries = [
             "What are the latest AI developments in 2025?",
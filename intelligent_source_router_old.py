@@ -188,8 +188,11 @@ class IntelligentSourceRouter:
             if local_retriever:
                 local_docs = local_retriever.get_relevant_documents(query)
             
+            # Built once with 'type' set: these dicts are both the hybrid
+            # input (format_hybrid_context ignores 'type') and the sources
             local_results = [
                 {
+                    'type': 'local',
                     'source': doc.metadata.get('source', 'Unknown'),
                     'page': doc.metadata.get('page', 'N/A'),
                     'content': doc.page_content
@@ -208,9 +211,7 @@ class IntelligentSourceRouter:
             context = self.hybrid_search.format_hybrid_context(hybrid_results)
             
             # Combine sources
-            sources = [
-                {'type': 'local', **lr} for lr in local_results
-            ] + [
+            sources = local_results + [
                 {'type': 'web', **wr} for wr in hybrid_results['web_results']
             ]
             
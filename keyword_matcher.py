@@ -0,0 +1,76 @@
+"""
+Keyword Matcher Module
+Finds which keyword groups occur in a text with a single scan
+"""
+
+from typing import Dict, Iterable, Set
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher over tagged keyword groups
+
+    Uses a pyahocorasick automaton when available, otherwise a single
+    precompiled regex alternation. Both scan the text once, and both keep
+    plain `keyword in text` semantics (no word boundaries).
+    """
+
+    def __init__(self, keyword_groups: Dict[str, Iterable[str]]):
+        """
+        Build the matcher
+
+        Args:
+            keyword_groups: Mapping of tag -> lowercase keywords
+        """
+        keyword_tags: Dict[str, Set[str]] = {}
+        for tag, keywords in keyword_groups.items():
+            for keyword in keywords:
+                keyword_tags.setdefault(keyword, set()).add(tag)
+
+        # A match on a keyword implies a match on every keyword that prefixes it
+        # (needed by the regex path, which reports one match per position)
+        for keyword, tags in keyword_tags.items():
+            for other, other_tags in keyword_tags.items():
+                if other != keyword and keyword.startswith(other):
+                    tags |= other_tags
+
+        self._keyword_tags = {kw: frozenset(tags) for kw, tags in keyword_tags.items()}
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, tags in self._keyword_tags.items():
+                self._automaton.add_word(keyword, tags)
+            self._automaton.make_automaton()
+            self._pattern = None
+        else:
+            self._automaton = None
+            alternation = "|".join(
+                re.escape(kw) for kw in sorted(self._keyword_tags, key=len, reverse=True)
+            )
+            # Zero-width lookahead so overlapping keywords are all reported
+            self._pattern = re.compile(f"(?=({alternation}))")
+
+    def tags(self, text: str) -> Set[str]:
+        """
+        Get the tags of all keyword groups found in text
+
+        Args:
+            text: Lowercased text to scan
+
+        Returns:
+            Set of matched tags
+        """
+        found: Set[str] = set()
+        if self._automaton is not None:
+            for _, tags in self._automaton.iter(text):
+                found |= tags
+        else:
+            for match in self._pattern.finditer(text):
+                found |= self._keyword_tags[match.group(1)]
+        return found
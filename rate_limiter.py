@@ -0,0 +1,55 @@
+"""
+Rate Limiter Module
+Non-blocking token bucket for per-backend request quotas
+"""
+
+from typing import Any, Dict, Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Tokens refill continuously at `rate` per `per` seconds up to `capacity`.
+    try_acquire never sleeps: callers that are out of tokens are expected
+    to skip the request (e.g. fall through to another backend).
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, capacity: Optional[float] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per period
+            per: Period length in seconds
+            capacity: Maximum burst size (defaults to rate)
+        """
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._refill_per_sec = rate / per
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.denied = 0
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available; return False instead of waiting"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._refill_per_sec)
+            self._updated = now
+            if self._tokens < tokens:
+                self.denied += 1
+                return False
+            self._tokens -= tokens
+            return True
+
+    def info(self) -> Dict[str, Any]:
+        """Get bucket statistics"""
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'available': self._tokens,
+                'denied': self.denied
+            }
@@ -0,0 +1,250 @@
+"""
+Semantic Cache Module
+Reuses cached values for near-duplicate queries based on embedding similarity
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Embedding-based cache for paraphrased queries
+
+    Query vectors are kept unit-normalized in an (N x D) float32 matrix so
+    cosine similarity is a single matrix-vector product. Once the cache
+    grows past `hnsw_threshold` entries an HNSW index (hnswlib, optional)
+    replaces the linear scan.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Sequence[float]],
+        threshold: float = 0.88,
+        max_entries: int = 5000,
+        ttl: Optional[float] = None,
+        hnsw_threshold: int = 2000,
+        persist_path: Optional[str] = None,
+        save_every: int = 25
+    ):
+        """
+        Initialize the semantic cache
+
+        Args:
+            embed_fn: Function mapping a query string to an embedding vector
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached entries
+            ttl: Seconds an entry stays valid (None disables expiry)
+            hnsw_threshold: Entry count above which the HNSW index is used
+            persist_path: Base path for the .npy/.json warm-start files
+            save_every: Persist to disk after this many new entries
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hnsw_threshold = hnsw_threshold
+        self.persist_path = persist_path
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        self._vecs: Optional[np.ndarray] = None
+        self._size = 0
+        self._values: List[Any] = []
+        self._timestamps: List[float] = []
+        self._index = None
+        self._unsaved = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self._load()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text and normalize it to unit length"""
+        vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, vec: np.ndarray) -> Optional[Any]:
+        """
+        Find the most similar cached entry
+
+        Args:
+            vec: Unit-normalized query embedding
+
+        Returns:
+            Cached value if similarity >= threshold, otherwise None
+        """
+        with self._lock:
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            if self._index is not None:
+                labels, distances = self._index.knn_query(vec, k=1)
+                idx = int(labels[0][0])
+                score = 1.0 - float(distances[0][0])
+            else:
+                scores = self._vecs[:self._size] @ vec
+                idx = int(np.argmax(scores))
+                score = float(scores[idx])
+
+            expired = self.ttl is not None and time.time() - self._timestamps[idx] > self.ttl
+            if score < self.threshold or expired:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            logger.debug(f"🧠 Semantic cache hit (similarity {score:.3f})")
+            return self._values[idx]
+
+    def add(self, vec: np.ndarray, value: Any):
+        """Store a value under the given unit-normalized embedding"""
+        with self._lock:
+            if self._size >= self.max_entries:
+                self._compact()
+
+            if self._vecs is None:
+                self._vecs = np.zeros((64, vec.shape[0]), dtype=np.float32)
+            elif self._size == self._vecs.shape[0]:
+                grown = np.zeros((self._vecs.shape[0] * 2, self._vecs.shape[1]), dtype=np.float32)
+                grown[:self._size] = self._vecs[:self._size]
+                self._vecs = grown
+
+            self._vecs[self._size] = vec
+            self._values.append(value)
+            self._timestamps.append(time.time())
+            self._size += 1
+
+            if self._index is not None:
+                if self._index.get_max_elements() < self._size:
+                    self._index.resize_index(self._vecs.shape[0])
+                self._index.add_items(vec[np.newaxis, :], [self._size - 1])
+            elif self._size > self.hnsw_threshold:
+                self._build_index()
+
+            self._unsaved += 1
+            if self.persist_path and self._unsaved >= self.save_every:
+                self._save()
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._vecs = None
+            self._size = 0
+            self._values = []
+            self._timestamps = []
+            self._index = None
+            self.hits = 0
+            self.misses = 0
+
+    def save(self):
+        """Persist vectors and values to disk"""
+        if not self.persist_path:
+            return
+        with self._lock:
+            self._save()
+
+    def info(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'currsize': self._size,
+            'threshold': self.threshold,
+            'index': 'hnsw' if self._index is not None else 'linear'
+        }
+
+    def _compact(self):
+        """Drop expired entries, then the oldest quarter if still full"""
+        drop = 0
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            while drop < self._size and self._timestamps[drop] < cutoff:
+                drop += 1
+        if self._size - drop >= self.max_entries:
+            drop = max(drop, self.max_entries // 4)
+
+        keep = self._size - drop
+        self._vecs[:keep] = self._vecs[drop:self._size]
+        self._values = self._values[drop:]
+        self._timestamps = self._timestamps[drop:]
+        self._size = keep
+
+        # Row indices shifted, so the index labels are stale
+        self._index = None
+        if self._size > self.hnsw_threshold:
+            self._build_index()
+
+    def _build_index(self):
+        """Build an HNSW index over the current vectors"""
+        if hnswlib is None:
+            return
+        index = hnswlib.Index(space='cosine', dim=self._vecs.shape[1])
+        index.init_index(max_elements=self._vecs.shape[0], ef_construction=200, M=16)
+        index.add_items(self._vecs[:self._size], np.arange(self._size))
+        index.set_ef(50)
+        self._index = index
+        logger.info(f"🧠 Semantic cache switched to HNSW index ({self._size} entries)")
+
+    def _save(self):
+        """Write vectors (.npy) and values/timestamps (.json)"""
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            vecs = self._vecs[:self._size] if self._vecs is not None else np.zeros((0, 0), dtype=np.float32)
+            np.save(f"{self.persist_path}.npy", vecs)
+            with open(f"{self.persist_path}.json", 'w', encoding='utf-8') as f:
+                json.dump({'timestamps': self._timestamps, 'values': self._values}, f, default=self._json_default)
+            self._unsaved = 0
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to persist semantic cache: {e}")
+
+    @staticmethod
+    def _json_default(obj: Any) -> Any:
+        """Serialize record objects that expose to_dict()"""
+        if hasattr(obj, 'to_dict'):
+            return obj.to_dict()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _load(self):
+        """Warm-start from files written by a previous process"""
+        vec_path = f"{self.persist_path}.npy"
+        meta_path = f"{self.persist_path}.json"
+        if not (os.path.exists(vec_path) and os.path.exists(meta_path)):
+            return
+        try:
+            vecs = np.load(vec_path).astype(np.float32)
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if vecs.ndim != 2 or len(meta['values']) != vecs.shape[0] or vecs.shape[0] == 0:
+                return
+
+            size = min(vecs.shape[0], self.max_entries)
+            self._vecs = np.zeros((max(64, size), vecs.shape[1]), dtype=np.float32)
+            self._vecs[:size] = vecs[-size:]
+            self._values = meta['values'][-size:]
+            self._timestamps = meta['timestamps'][-size:]
+            self._size = size
+            if self._size > self.hnsw_threshold:
+                self._build_index()
+            logger.info(f"🧠 Semantic cache warm-started with {self._size} entries")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load semantic cache: {e}")
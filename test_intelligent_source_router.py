@@ -0,0 +1,233 @@
+"""
+Tests for intelligent_source_router.IntelligentSourceRouter
+"""
+
+import threading
+
+import pytest
+
+from intelligent_source_router import IntelligentSourceRouter, LocalSource, WebSource
+from query_classifier import SmartClassifierCache
+
+
+class FakeClassifier:
+    """Routes every query to a fixed datasource"""
+
+    def __init__(self, datasource, before=None):
+        self.datasource = datasource
+        self.before = before
+        self.calls = 0
+        self.cache = SmartClassifierCache()
+
+    def classify_query(self, query, has_uploaded_docs=False):
+        self.calls += 1
+        if self.before is not None:
+            self.before()
+        return {"datasource": self.datasource, "reasoning": "fake", "confidence": 0.9, "query": query}
+
+
+class FakeWebSearch:
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+
+    def search_and_extract(self, query, fetch_content=False):
+        self.calls.append(query)
+        self.started.set()
+        return [{"title": "T", "url": "https://x", "snippet": "s", "full_content": "f",
+                 "source": "Tavily", "type": "web"}]
+
+
+class Doc:
+    def __init__(self, content, metadata):
+        self.page_content = content
+        self.metadata = metadata
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    def get_relevant_documents(self, query):
+        self.calls += 1
+        return [Doc("local text", {"source": "a.pdf", "page": 1, "chunk": 0})]
+
+
+@pytest.fixture
+def web():
+    return FakeWebSearch()
+
+
+def make_router(web, datasource, before=None, **kwargs):
+    router = IntelligentSourceRouter(api_key="sk-test", enable_semantic_cache=False, **kwargs)
+    router.query_classifier = FakeClassifier(datasource, before)
+    router.web_search = web
+    return router
+
+
+@pytest.mark.parametrize("record", [
+    LocalSource(source="a.pdf", page=1, chunk=0, content="text"),
+    WebSource(title="t", url="https://x", snippet="s", full_content="f", source="Tavily", result_type="web"),
+])
+def test_source_records_have_a_consistent_mapping_view(record):
+    as_dict = record.to_dict()
+
+    assert list(as_dict) == record.keys()
+    for key in record.keys():
+        assert key in record
+        assert record[key] == record.get(key) == as_dict[key]
+    assert "missing" not in record
+    assert record.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        record["missing"]
+
+
+def test_web_source_has_no_content_key():
+    record = WebSource(title="t", url="https://x", snippet="s", full_content="f", source="Tavily", result_type="web")
+
+    assert "content" not in record
+    assert record.get("full_content") == "f"
+
+
+def test_prefetch_overlaps_classification_without_docs(web):
+    # The classifier only returns once the speculative search has started
+    router = make_router(web, "web_search", before=lambda: web.started.wait(5))
+
+    result = router.route_query("latest news", has_uploaded_docs=False)
+
+    assert web.started.is_set()
+    assert web.calls == ["latest news"]
+    assert result["retrieval_type"] == "web_search"
+
+
+def test_no_prefetch_for_local_queries_with_docs(web):
+    # Give a (wrongly) speculative search time to start before routing on
+    router = make_router(web, "local_rag", before=lambda: web.started.wait(0.2))
+
+    result = router.route_query("summarize my document", FakeRetriever(), has_uploaded_docs=True)
+
+    assert result["retrieval_type"] == "local_rag"
+    assert web.calls == []
+
+
+def test_docs_query_routed_to_web_searches_once(web):
+    def before():
+        web.started.wait(0.2)
+        calls_at_classification.append(len(web.calls))
+
+    router = make_router(web, "web_search", before=before)
+    calls_at_classification = []
+
+    router.route_query("what is python", FakeRetriever(), has_uploaded_docs=True)
+
+    assert calls_at_classification == [0]
+    assert web.calls == ["what is python"]
+
+
+def test_speculation_can_be_disabled(web):
+    router = make_router(web, "web_search", before=lambda: calls_at_classification.append(len(web.calls)),
+                         enable_speculative=False)
+    calls_at_classification = []
+
+    router.route_query("latest news", has_uploaded_docs=False)
+
+    assert calls_at_classification == [0]
+    assert web.calls == ["latest news"]
+
+
+def test_repeat_query_is_served_from_the_cache(web):
+    router = make_router(web, "web_search")
+
+    first = router.route_query("latest news")
+    first["context"] = "mutated by the caller"
+    second = router.route_query("latest news")
+
+    assert router.query_classifier.calls == 1
+    assert web.calls == ["latest news"]
+    assert second["context"] != "mutated by the caller"
+    assert router._result_cache.info()["hits"] == 1
+
+
+def test_cache_key_ignores_retriever_identity(web):
+    router = make_router(web, "local_rag")
+    retriever = FakeRetriever()
+
+    # The chatbot builds a new retriever object per query
+    router.route_query("summarize my document", FakeRetriever(), has_uploaded_docs=True)
+    router.route_query("summarize my document", retriever, has_uploaded_docs=True)
+
+    assert router.query_classifier.calls == 1
+    assert retriever.calls == 0
+
+
+def test_cache_key_includes_docs_flag(web):
+    router = make_router(web, "web_search")
+
+    router.route_query("what is python", has_uploaded_docs=False)
+    router.route_query("what is python", FakeRetriever(), has_uploaded_docs=True)
+
+    assert router.query_classifier.calls == 2
+
+
+def test_cache_clear_invalidates_results(web):
+    router = make_router(web, "local_rag")
+    retriever = FakeRetriever()
+    router.route_query("summarize my document", retriever, has_uploaded_docs=True)
+
+    router.cache_clear()
+    router.route_query("summarize my document", retriever, has_uploaded_docs=True)
+
+    assert router.query_classifier.calls == 2
+    assert retriever.calls == 2
+
+
+def test_errors_are_not_cached(web):
+    router = make_router(web, "local_rag")
+
+    # No retriever: local_rag reports an error
+    assert router.route_query("summarize my document", has_uploaded_docs=True).get("error")
+    router.route_query("summarize my document", has_uploaded_docs=True)
+
+    assert router.query_classifier.calls == 2
+
+
+def test_history_ring_keeps_the_latest_entries(web):
+    router = make_router(web, "web_search", history_size=3)
+    routes = [("q1", "web_search"), ("q2", "local_rag"), ("q3", "web_search"),
+              ("q4", "local_rag"), ("q5", "web_search")]
+    for query, datasource in routes:
+        router.query_classifier.datasource = datasource
+        router.route_query(query, FakeRetriever(), has_uploaded_docs=True)
+
+    history = router.routing_history
+    assert [(h["query"], h["datasource"]) for h in history] == routes[2:]
+    assert [h["query"] for h in router.get_recent_history(2)] == ["q4", "q5"]
+    assert history[-1]["num_sources"] == 1 and history[-1]["confidence"] == pytest.approx(0.9)
+
+    stats = router.get_routing_stats()
+    assert stats["total_queries"] == 5
+    assert stats["by_source"] == {"web_search": 3, "local_rag": 2}
+    assert stats["recent"]["window"] == 3
+    assert stats["recent"]["by_source"] == {"web_search": 2, "local_rag": 1}
+
+
+def test_history_is_empty_before_any_query(web):
+    router = make_router(web, "web_search")
+
+    assert router.routing_history == []
+    assert router.get_recent_history() == []
+    assert router.get_routing_stats()["total_queries"] == 0
+
+
+def test_concurrent_routing_keeps_counters_consistent(web):
+    router = make_router(web, "web_search", history_size=50)
+
+    threads = [threading.Thread(target=router.route_query, args=(f"query {i}",)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = router.get_routing_stats()
+    assert stats["total_queries"] == 40
+    assert len(router.routing_history) == 40
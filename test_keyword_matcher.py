@@ -0,0 +1,67 @@
+"""
+Tests for keyword_matcher.KeywordMatcher
+"""
+
+import random
+
+import pytest
+
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+
+
+GROUPS = {
+    "doc": ("document", "doc", "pdf", "my file", "uploaded"),
+    "web": ("latest", "news", "today", "current", "doc news"),
+    "general": ("what is", "what", "define", "explain"),
+}
+
+TEXTS = [
+    "",
+    "what is the latest news today",
+    "summarize my document",
+    "explain the pdf i uploaded",
+    "docs and doc news",
+    "nothing relevant here",
+    "whatever",
+]
+
+
+def reference_tags(text):
+    """Plain `keyword in text` semantics the matcher must reproduce"""
+    return {tag for tag, keywords in GROUPS.items() if any(kw in text for kw in keywords)}
+
+
+def random_texts(n=300, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [kw for keywords in GROUPS.values() for kw in keywords] + ["the", "a", "x", "s", " "]
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 6))) for _ in range(n)]
+
+
+@pytest.fixture(params=["automaton", "regex"])
+def matcher(request, monkeypatch):
+    if request.param == "automaton":
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr(keyword_matcher, "ahocorasick", None)
+    return KeywordMatcher(GROUPS)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_matches_substring_semantics(matcher, text):
+    assert matcher.tags(text) == reference_tags(text)
+
+
+def test_random_texts_match_reference(matcher):
+    for text in random_texts():
+        assert matcher.tags(text) == reference_tags(text), text
+
+
+def test_automaton_and_regex_agree(monkeypatch):
+    pytest.importorskip("ahocorasick")
+    automaton = KeywordMatcher(GROUPS)
+    monkeypatch.setattr(keyword_matcher, "ahocorasick", None)
+    regex = KeywordMatcher(GROUPS)
+
+    for text in TEXTS + random_texts(seed=11):
+        assert automaton.tags(text) == regex.tags(text), text
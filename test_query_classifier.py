@@ -0,0 +1,162 @@
+"""
+Tests for query_classifier.QueryClassifier routing rules
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import query_classifier
+from query_classifier import QueryClassifier
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    classifier = QueryClassifier(api_key="sk-test")
+    calls = []
+
+    def fake_complete(chain, inputs, opener):
+        calls.append(inputs)
+        return json.dumps({"datasource": "local_rag", "reasoning": "llm", "confidence": 0.9})
+
+    monkeypatch.setattr(classifier, "_complete", fake_complete)
+    classifier.llm_calls = calls
+    return classifier
+
+
+@pytest.mark.parametrize("query, has_docs, expected", [
+    ("What is machine learning?", False, "web_search"),
+    ("Summarize my uploaded PDF", False, "web_search"),
+    ("Latest AI news", True, "web_search"),
+    ("What is machine learning?", True, "web_search"),
+    ("What does my document say about AI?", True, "local_rag"),
+])
+def test_unambiguous_queries_skip_the_llm(classifier, query, has_docs, expected):
+    result = classifier.classify_query(query, has_uploaded_docs=has_docs)
+
+    assert result["datasource"] == expected
+    assert classifier.llm_calls == []
+
+
+@pytest.mark.parametrize("query", [
+    "What is the conclusion of the paper?",
+    "Explain the attachment",
+    "What is in my notes?",
+])
+def test_document_indicators_defer_to_the_llm(classifier, query):
+    assert classifier._rule_based_classification(query, query.lower(), True) is None
+
+    result = classifier.classify_query(query, has_uploaded_docs=True)
+
+    assert len(classifier.llm_calls) == 1
+    assert result["datasource"] == "local_rag"
+
+
+def test_query_without_any_signal_defers_to_the_llm(classifier):
+    query = "Compare the two approaches"
+
+    assert classifier._rule_based_classification(query, query.lower(), True) is None
+
+
+def test_rule_decisions_are_not_cached(classifier):
+    classifier.classify_query("Latest AI news", has_uploaded_docs=True)
+
+    assert classifier.cache.stats()["currsize"] == 0
+
+
+@pytest.mark.parametrize("content", [
+    '{"datasource": "hybrid", "reasoning": "both", "confidence": 0.7}',
+    '  \n{"datasource": "hybrid", "reasoning": "both", "confidence": 0.7}',
+    'Here you go:\n```json\n{"datasource": "hybrid", "reasoning": "both", "confidence": 0.7}\n```',
+    'Sure {not json} {"datasource": "hybrid", "reasoning": "both", "confidence": 0.7} done',
+])
+def test_parse_json_response_extracts_object(classifier, content):
+    assert classifier._parse_json_response(content) == {
+        "datasource": "hybrid", "reasoning": "both", "confidence": 0.7
+    }
+
+
+def test_parse_json_response_handles_nested_objects(classifier):
+    content = 'Answer: {"datasource": "local_rag", "meta": {"k": 1}, "confidence": 0.9}'
+
+    assert classifier._parse_json_response(content)["meta"] == {"k": 1}
+
+
+def test_parse_json_response_falls_back_to_manual_extraction(classifier):
+    content = 'datasource: local_rag, "reasoning": "mentions my file", "confidence": 0.65'
+
+    assert classifier._parse_json_response(content) == {
+        "datasource": "local_rag", "reasoning": "mentions my file", "confidence": 0.65
+    }
+
+
+def test_parse_json_response_skips_direct_parse_for_prose(classifier, monkeypatch):
+    def direct_parse(content):
+        raise AssertionError("direct parse attempted")
+
+    monkeypatch.setattr(query_classifier, "_json_loads", direct_parse)
+
+    assert classifier._parse_json_response('Route: {"datasource": "hybrid"}') == {"datasource": "hybrid"}
+    with pytest.raises(AssertionError):
+        classifier._parse_json_response('{"datasource": "hybrid"}')
+
+
+def test_parse_json_array(classifier):
+    content = 'Results [see below]:\n[{"datasource": "web_search"}, {"datasource": "hybrid"}]'
+
+    assert classifier._parse_json_array(content) == [{"datasource": "web_search"}, {"datasource": "hybrid"}]
+    assert classifier._parse_json_array('[{"datasource": "hybrid"}]') == [{"datasource": "hybrid"}]
+    assert classifier._parse_json_array("no array here") == []
+
+
+AMBIGUOUS = ["Explain the attachment", "What is in my notes?", "Compare the two approaches"]
+
+
+def test_classify_batch_sends_ambiguous_queries_in_one_call(classifier, monkeypatch):
+    def fake_complete(chain, inputs, opener):
+        classifier.llm_calls.append(inputs)
+        assert opener == "["
+        return json.dumps([{"datasource": "local_rag", "confidence": 0.9}] * len(AMBIGUOUS))
+
+    monkeypatch.setattr(classifier, "_complete", fake_complete)
+    items = [("Latest AI news", True)] + [(query, True) for query in AMBIGUOUS]
+
+    results = classifier.classify_batch(items)
+
+    assert len(classifier.llm_calls) == 1
+    # The last query has no document indicator, so local_rag is overridden
+    assert [r["datasource"] for r in results] == ["web_search", "local_rag", "local_rag", "web_search"]
+    assert [r["query"] for r in results] == [query for query, _ in items]
+
+    # Answers are cached: repeating the batch costs no LLM call
+    classifier.classify_batch(items)
+    assert len(classifier.llm_calls) == 1
+
+
+def test_classify_batch_falls_back_for_missing_decisions(classifier, monkeypatch):
+    monkeypatch.setattr(classifier, "_complete", lambda chain, inputs, opener: '[{"datasource": "hybrid"}]')
+
+    results = classifier.classify_batch([(query, True) for query in AMBIGUOUS])
+
+    assert [r["datasource"] for r in results] == ["hybrid", "web_search", "web_search"]
+    # Only the LLM answer is cached; the fallbacks are retried next time
+    assert classifier.cache.stats()["currsize"] == 1
+
+
+def test_concurrent_async_calls_share_one_batch(classifier, monkeypatch):
+    batches = []
+
+    def fake_batch(items):
+        batches.append(items)
+        return [{"datasource": "local_rag", "query": query} for query, _ in items]
+
+    monkeypatch.setattr(classifier, "classify_batch", fake_batch)
+
+    async def run():
+        return await asyncio.gather(*(classifier.classify_query_async(q, True) for q in AMBIGUOUS))
+
+    results = asyncio.run(run())
+
+    assert batches == [[(query, True) for query in AMBIGUOUS]]
+    assert [r["query"] for r in results] == AMBIGUOUS
@@ -0,0 +1,49 @@
+"""
+Tests for rate_limiter.TokenBucket
+"""
+
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_allows_burst_up_to_capacity(clock):
+    bucket = TokenBucket(rate=3, per=60.0)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.info()["denied"] == 1
+
+
+def test_refills_over_time(clock):
+    bucket = TokenBucket(rate=3, per=60.0)
+    for _ in range(3):
+        bucket.try_acquire()
+
+    clock[0] += 19  # 0.95 tokens
+    assert not bucket.try_acquire()
+    clock[0] += 2
+    assert bucket.try_acquire()
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=2, per=1.0, capacity=2)
+
+    clock[0] += 3600
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_denied_request_does_not_consume_tokens(clock):
+    bucket = TokenBucket(rate=1, per=10.0)
+    bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock[0] += 10
+    assert bucket.try_acquire()
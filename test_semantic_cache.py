@@ -0,0 +1,66 @@
+"""
+Tests for semantic_cache.SemanticCache
+"""
+
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+
+VECTORS = {
+    "what is python": [1.0, 0.0, 0.0],
+    "explain python": [0.99, 0.14, 0.0],   # cosine ~0.99 with "what is python"
+    "python vs java": [0.7, 0.7, 0.0],     # cosine ~0.71
+    "weather today": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(embed_fn=VECTORS.__getitem__, threshold=0.9)
+
+
+def test_empty_cache_misses(cache):
+    assert cache.lookup(cache.embed("what is python")) is None
+    assert cache.info()["misses"] == 1
+
+
+def test_similar_query_hits(cache):
+    cache.add(cache.embed("what is python"), "answer")
+
+    assert cache.lookup(cache.embed("explain python")) == "answer"
+    assert cache.info()["hits"] == 1
+
+
+def test_dissimilar_queries_miss(cache):
+    cache.add(cache.embed("what is python"), "answer")
+
+    assert cache.lookup(cache.embed("python vs java")) is None
+    assert cache.lookup(cache.embed("weather today")) is None
+    assert cache.info()["misses"] == 2
+
+
+def test_best_match_is_returned(cache):
+    cache.add(cache.embed("weather today"), "weather")
+    cache.add(cache.embed("what is python"), "python")
+
+    assert cache.lookup(cache.embed("explain python")) == "python"
+
+
+def test_expired_entry_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    cache = SemanticCache(embed_fn=VECTORS.__getitem__, threshold=0.9, ttl=60)
+    cache.add(cache.embed("what is python"), "answer")
+
+    now[0] += 61
+    assert cache.lookup(cache.embed("what is python")) is None
+
+
+def test_clear_drops_entries(cache):
+    cache.add(cache.embed("what is python"), "answer")
+    cache.clear()
+
+    assert cache.info()["currsize"] == 0
+    assert cache.lookup(cache.embed("what is python")) is None
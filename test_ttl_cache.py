@@ -0,0 +1,118 @@
+"""
+Tests for ttl_cache.TTLCache
+"""
+
+import pytest
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", fake)
+    return fake
+
+
+def test_get_returns_value_before_expiry(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+
+    clock.now += 9
+    assert cache.get("a") == 1
+    assert cache.info()["hits"] == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+
+    clock.now += 11
+    assert cache.get("a", "missing") == "missing"
+    assert cache.info()["misses"] == 1
+    assert len(cache) == 0
+
+
+def test_no_ttl_never_expires(clock):
+    cache = TTLCache(maxsize=4, ttl=None)
+    cache.set("a", 1)
+
+    clock.now += 10 ** 9
+    assert cache.get("a") == 1
+
+
+def test_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.info()["evictions"] == 1
+
+
+def test_clear_resets_entries_and_counters(clock):
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.clear()
+
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["evictions"], info["currsize"]) == (0, 0, 0, 0)
+
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = TTLCache(maxsize=2, ttl=60, path=path)
+    cache.set(("q", 5), [{"title": "t"}])
+    cache.close()
+
+    reopened = TTLCache(maxsize=2, ttl=60, path=path)
+    try:
+        assert reopened.get(("q", 5)) == [{"title": "t"}]
+    finally:
+        reopened.close()
+
+
+def test_disk_tier_drops_evicted_entries(tmp_path):
+    cache = TTLCache(maxsize=2, ttl=None, path=str(tmp_path / "cache"))
+    try:
+        for key in "abcde":
+            cache.set(key, key.upper())
+
+        assert sorted(cache._store.keys()) == ["'d'", "'e'"]
+    finally:
+        cache.close()
+
+
+def test_disk_tier_is_pruned_when_opened(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache")
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "time", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=60, path=path)
+    for key in "abcd":
+        cache.set(key, key.upper())
+        now[0] += 20
+    cache.close()
+
+    # "a" (saved 80s ago) has expired; maxsize=2 keeps the newest of the rest
+    reopened = TTLCache(maxsize=2, ttl=60, path=path)
+    try:
+        assert sorted(reopened._store.keys()) == ["'c'", "'d'"]
+        assert reopened.get("d") == "D"
+    finally:
+        reopened.close()
@@ -0,0 +1,269 @@
+"""
+Tests for page text extraction in web_search_tavily
+"""
+
+import sys
+import threading
+import time
+
+import pytest
+
+import web_search_tavily
+from web_search_tavily import WebSearchEnhanced
+
+
+PAGE = (
+    b"<html><head><style>p {}</style></head><body>"
+    b"<nav>Menu</nav><p>Hello   world</p>\n<p>second\tline</p>"
+    b"<script>var x = 1;</script><noscript>enable js</noscript>"
+    b"<footer>Footer</footer></body></html>"
+)
+
+
+@pytest.fixture
+def web_search():
+    return WebSearchEnhanced(max_results=3)
+
+
+def test_extract_text_selectolax(web_search):
+    pytest.importorskip("selectolax.parser")
+    assert web_search_tavily.HTMLParser is not None
+
+    text = web_search._extract_text(PAGE)
+
+    assert text == "Hello world second line"
+
+
+def test_extract_text_lxml(web_search, monkeypatch):
+    pytest.importorskip("lxml.html")
+    monkeypatch.setattr(web_search_tavily, "HTMLParser", None)
+
+    text = web_search._extract_text(PAGE)
+
+    assert "Hello world" in text and "second" in text
+    for dropped in ("Menu", "var x", "enable js", "Footer"):
+        assert dropped not in text
+
+
+def test_extract_text_beautifulsoup(web_search, monkeypatch):
+    pytest.importorskip("bs4")
+    monkeypatch.setattr(web_search_tavily, "HTMLParser", None)
+    monkeypatch.setitem(sys.modules, "lxml", None)  # makes the lxml import fail
+
+    text = web_search._extract_text(PAGE)
+
+    assert "Hello world" in text and "second" in text
+    for dropped in ("Menu", "var x", "enable js", "Footer"):
+        assert dropped not in text
+
+
+@pytest.fixture
+def status_retry_transport(monkeypatch):
+    if web_search_tavily.httpx is None:
+        pytest.skip("httpx with HTTP/2 support is not installed")
+    sleeps = []
+    monkeypatch.setattr(web_search_tavily.time, "sleep", sleeps.append)
+
+    def build(statuses, headers=None):
+        statuses = list(statuses)
+
+        def handler(request):
+            return web_search_tavily.httpx.Response(statuses.pop(0), headers=headers or {})
+
+        mock = web_search_tavily.httpx.MockTransport(handler)
+        return web_search_tavily._StatusRetryTransport(mock, retries=3, backoff_factor=1.0), sleeps
+
+    return build
+
+
+def test_httpx_transport_retries_server_errors(status_retry_transport):
+    transport, sleeps = status_retry_transport([503, 502, 200])
+    client = web_search_tavily.httpx.Client(transport=transport)
+
+    assert client.get("https://example.com").status_code == 200
+    assert sleeps == [0.0, 2.0]
+
+
+def test_httpx_transport_gives_up_after_retries(status_retry_transport):
+    transport, sleeps = status_retry_transport([500] * 4)
+    client = web_search_tavily.httpx.Client(transport=transport)
+
+    assert client.get("https://example.com").status_code == 500
+    assert len(sleeps) == 3
+
+
+def test_httpx_transport_honours_retry_after(status_retry_transport):
+    transport, sleeps = status_retry_transport([429, 200], headers={"Retry-After": "5"})
+    client = web_search_tavily.httpx.Client(transport=transport)
+
+    assert client.get("https://example.com").status_code == 200
+    assert sleeps == [5.0]
+
+
+RESULTS = [
+    {"title": "A", "url": "https://a", "snippet": "a", "source": "Tavily", "type": "web"},
+    {"title": "B", "url": "https://b", "snippet": "b", "source": "Tavily", "type": "web"},
+]
+
+
+def test_concurrent_duplicate_searches_share_one_backend_call(web_search, monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_backends(query, results_limit, include_raw_content=False):
+        calls.append(query)
+        release.wait(5)
+        return [dict(result) for result in RESULTS]
+
+    monkeypatch.setattr(web_search, "_search_backends", slow_backends)
+    outputs = []
+    threads = [threading.Thread(target=lambda: outputs.append(web_search.search("q"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["q"]
+    assert outputs == [RESULTS] * 8
+    # Every caller gets its own dicts
+    outputs[0][0]["title"] = "changed"
+    assert web_search.search("q")[0]["title"] == "A"
+    assert calls == ["q"]
+
+
+def test_failed_search_propagates_to_followers_and_is_not_cached(web_search, monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def failing_backends(query, results_limit, include_raw_content=False):
+        calls.append(query)
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    monkeypatch.setattr(web_search, "_search_backends", failing_backends)
+    errors = []
+
+    def run():
+        try:
+            web_search.search("q")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["q"]
+    assert errors == ["backend down"] * 4
+
+    monkeypatch.setattr(web_search, "_search_backends", lambda *args, **kwargs: RESULTS)
+    assert web_search.search("q") == RESULTS
+
+
+def test_mock_fallback_is_not_cached(web_search, monkeypatch):
+    calls = []
+
+    def empty_backends(query, results_limit, include_raw_content=False):
+        calls.append(query)
+        return None
+
+    monkeypatch.setattr(web_search, "_search_backends", empty_backends)
+
+    assert web_search.search("q")
+    assert web_search.search("q")
+    assert calls == ["q", "q"]
+
+
+def result(url, source):
+    return {"title": url, "url": url, "snippet": "", "source": source, "type": "web"}
+
+
+@pytest.fixture
+def backends(web_search, monkeypatch):
+    """Replace every backend with a recorded stub; tests set the return values"""
+    monkeypatch.setattr(web_search, "_HEDGE_DELAY", 0.05)
+    calls = []
+    responses = {}
+
+    def stub(name):
+        def backend(query, max_results=None, include_raw_content=False):
+            calls.append(name)
+            delay, results = responses.get(name, (0, []))
+            time.sleep(delay)
+            return list(results)
+        return backend
+
+    for name in ("tavily", "wikipedia", "arxiv", "google_api", "bing_api"):
+        monkeypatch.setattr(web_search, f"search_{name}", stub(name))
+    return calls, responses
+
+
+def test_fast_full_tavily_result_is_not_hedged(web_search, backends):
+    calls, responses = backends
+    responses["tavily"] = (0, [result("https://t1", "Tavily"), result("https://t2", "Tavily")])
+
+    results = web_search._search_backends("q", 3)
+
+    assert [r["url"] for r in results] == ["https://t1", "https://t2"]
+    assert calls == ["tavily"]
+
+
+def test_thin_tavily_result_is_merged_with_fallbacks(web_search, backends):
+    calls, responses = backends
+    responses["tavily"] = (0, [result("https://t1", "Tavily")])
+    responses["wikipedia"] = (0, [result("https://t1", "Wikipedia"), result("https://w1", "Wikipedia")])
+
+    results = web_search._search_backends("q", 3)
+
+    assert [(r["url"], r["source"]) for r in results] == [("https://t1", "Tavily"), ("https://w1", "Wikipedia")]
+    assert sorted(calls) == ["arxiv", "tavily", "wikipedia"]
+
+
+def test_slow_tavily_is_hedged_but_keeps_priority(web_search, backends):
+    calls, responses = backends
+    responses["tavily"] = (0.3, [result("https://t1", "Tavily"), result("https://t2", "Tavily")])
+    responses["wikipedia"] = (0, [result("https://w1", "Wikipedia"), result("https://w2", "Wikipedia")])
+
+    results = web_search._search_backends("q", 3)
+
+    assert [r["source"] for r in results] == ["Tavily", "Tavily"]
+    assert "wikipedia" in calls and "google_api" not in calls
+
+
+def test_paid_apis_are_only_called_when_still_needed(web_search, backends):
+    calls, responses = backends
+    responses["google_api"] = (0, [result("https://g1", "Google"), result("https://g2", "Google")])
+
+    results = web_search._search_backends("q", 3)
+
+    assert [r["source"] for r in results] == ["Google", "Google"]
+    assert "bing_api" not in calls
+
+
+def test_all_backends_empty_returns_none(web_search, backends):
+    calls, _ = backends
+
+    assert web_search._search_backends("q", 3) is None
+    assert sorted(calls) == ["arxiv", "bing_api", "google_api", "tavily", "wikipedia"]
+
+
+def test_dedupe_by_url_keeps_first_occurrence():
+    results = [
+        result("https://a", "Tavily"),
+        {"title": "Direct Answer", "url": "", "snippet": "x", "source": "Tavily", "type": "answer"},
+        result("https://a", "Wikipedia"),
+        {"title": "Another answer", "url": "", "snippet": "y", "source": "Tavily", "type": "answer"},
+        result("https://b", "ArXiv"),
+    ]
+
+    unique = WebSearchEnhanced._dedupe_by_url(results)
+
+    assert [(r["url"], r["source"]) for r in unique] == [
+        ("https://a", "Tavily"), ("", "Tavily"), ("", "Tavily"), ("https://b", "ArXiv")
+    ]
@@ -0,0 +1,18 @@
+"""
+Time Utilities Module
+Date formatting shared by the router and web search context builders
+"""
+
+from datetime import datetime
+import functools
+import time
+
+
+@functools.lru_cache(maxsize=1)
+def _format_date(ts_minute: int) -> str:
+    return datetime.now().strftime('%B %d, %Y')
+
+
+def today() -> str:
+    """Current date as 'Month DD, YYYY', formatted at most once per minute"""
+    return _format_date(int(time.time()) // 60)
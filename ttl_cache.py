@@ -0,0 +1,161 @@
+"""
+TTL Cache Module
+Small thread-safe LRU cache with per-entry expiry and optional disk tier
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import os
+import shelve
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a fixed time-to-live
+
+    Entries are stored as (timestamp, value) pairs in an OrderedDict;
+    expired entries are evicted lazily when they are accessed. If a path
+    is given, entries are also written to a shelve file so they survive
+    process restarts (values must be picklable, keys are stored by repr).
+    Evicted and expired entries are deleted from the file too, and it is
+    trimmed to maxsize entries when opened, so it stays bounded.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: Optional[float] = 300.0, path: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries kept in memory
+            ttl: Seconds an entry stays valid (None disables expiry)
+            path: Shelve file used as a persistent second tier (optional)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._store = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._store = shelve.open(path)
+            self._prune_store()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None and self._store is not None:
+                entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            timestamp, value = entry
+            if self.ttl is not None and time.monotonic() - timestamp > self.ttl:
+                del self._data[key]
+                self._discard_stored(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            self._evict_overflow()
+            if self._store is not None:
+                self._store[repr(key)] = (time.time(), value)
+
+    def clear(self) -> None:
+        """Drop all entries and reset hit/miss counters"""
+        with self._lock:
+            self._data.clear()
+            if self._store is not None:
+                self._store.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def close(self) -> None:
+        """Flush and close the persistent tier"""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+    def _load(self, key: Hashable) -> Optional[tuple]:
+        """Promote an entry from the persistent tier into memory"""
+        stored = self._store.get(repr(key))
+        if stored is None:
+            return None
+
+        saved_at, value = stored
+        age = time.time() - saved_at
+        if self.ttl is not None and age > self.ttl:
+            del self._store[repr(key)]
+            return None
+
+        # Keep the remaining lifetime when moving to the monotonic clock
+        entry = (time.monotonic() - age, value)
+        self._data[key] = entry
+        self._evict_overflow()
+        return entry
+
+    def _evict_overflow(self) -> None:
+        """Drop least recently used entries (from both tiers) beyond maxsize"""
+        while len(self._data) > self.maxsize:
+            key, _ = self._data.popitem(last=False)
+            self._discard_stored(key)
+            self.evictions += 1
+
+    def _discard_stored(self, key: Hashable) -> None:
+        """Delete key from the persistent tier, if any"""
+        if self._store is not None:
+            self._store.pop(repr(key), None)
+
+    def _prune_store(self) -> None:
+        """Drop expired entries from the persistent tier and trim it to maxsize"""
+        now = time.time()
+        saved = []
+        for stored_key in list(self._store.keys()):
+            try:
+                saved_at, _ = self._store[stored_key]
+            except Exception:
+                # Unreadable entry (e.g. its class no longer unpickles)
+                del self._store[stored_key]
+                continue
+            if self.ttl is not None and now - saved_at > self.ttl:
+                del self._store[stored_key]
+            else:
+                saved.append((saved_at, stored_key))
+
+        saved.sort()
+        for _, stored_key in saved[:max(0, len(saved) - self.maxsize)]:
+            del self._store[stored_key]
+
+    def info(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'maxsize': self.maxsize,
+                'currsize': len(self._data),
+                'ttl': self.ttl
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,20 +1,121 @@
 
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 from datetime import datetime
+from urllib.parse import quote_plus
 import logging
-import time
 import random
 import os
-from xml.etree import ElementTree as ET
+import io
+import re
+import json
+import hashlib
+import threading
+import time
+import concurrent.futures
+from ttl_cache import TTLCache
+from time_utils import today
+from rate_limiter import TokenBucket
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import httpx
+    import h2  # noqa: F401 (needed by httpx for HTTP/2)
+except ImportError:
+    httpx = None
+
+# Transport errors raised by whichever HTTP client is in use
+if httpx is not None:
+    _TIMEOUT_ERRORS = (requests.Timeout, httpx.TimeoutException)
+    _CONNECTION_ERRORS = (requests.ConnectionError, httpx.TransportError)
+else:
+    _TIMEOUT_ERRORS = (requests.Timeout,)
+    _CONNECTION_ERRORS = (requests.ConnectionError,)
+
+# Responses worth retrying (same list as the requests Retry strategy)
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+if httpx is not None:
+    class _StatusRetryTransport(httpx.BaseTransport):
+        """
+        httpx transport wrapper retrying 429/5xx responses with backoff
+        
+        Mirrors the urllib3 Retry used for requests sessions: no wait before
+        the first retry, then backoff_factor * 2**n seconds, or the server's
+        Retry-After when it sends one.
+        """
+        
+        _MAX_BACKOFF = 120.0
+        
+        def __init__(self, transport: "httpx.BaseTransport", retries: int = 3, backoff_factor: float = 1.0):
+            self._transport = transport
+            self.retries = retries
+            self.backoff_factor = backoff_factor
+        
+        def handle_request(self, request: "httpx.Request") -> "httpx.Response":
+            for attempt in range(self.retries + 1):
+                response = self._transport.handle_request(request)
+                if response.status_code not in _RETRY_STATUSES or attempt == self.retries:
+                    return response
+                
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self.backoff_factor * (2 ** attempt) if attempt else 0.0
+                response.close()
+                logger.debug(f"Retrying {request.url} after HTTP {response.status_code} in {delay:.1f}s")
+                time.sleep(min(delay, self._MAX_BACKOFF))
+        
+        @staticmethod
+        def _retry_after(response: "httpx.Response") -> Optional[float]:
+            """Seconds from a numeric Retry-After header, if present"""
+            try:
+                return max(0.0, float(response.headers['Retry-After']))
+            except (KeyError, ValueError):
+                return None
+        
+        def close(self) -> None:
+            self._transport.close()
+
+# ✅ LOAD .env FILE AT MODULE LEVEL, unless the environment already has the key
+if os.getenv('TAVILY_API_KEY') is None:
+    from dotenv import load_dotenv
+    load_dotenv()  # This ensures API key is loaded when module is imported
 
-# ✅ AUTOMATICALLY LOAD .env FILE AT MODULE LEVEL
-from dotenv import load_dotenv
-load_dotenv()  # This ensures API key is loaded when module is imported
+# Browser-like headers sent with every request (User-Agent is added per variant)
+_STATIC_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Atom namespace in Clark notation, for the ArXiv feed
+_ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+# URLs for the placeholder results returned when every backend fails
+_MOCK_URL_TEMPLATES = (
+    'https://local.search/results?q={q}',
+    'https://local.search/related?q={q}'
+)
+
+# Highlight markup Wikipedia wraps around matched terms in search snippets
+_SEARCHMATCH_RE = re.compile(r'<span class="searchmatch">|</span>')
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,17 +129,24 @@ class TavilySearchIntegration:
     Tavily provides high-quality search results optimized for AI/LLM context
     """
     
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 15):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 15,
+        session: Optional[requests.Session] = None
+    ):
         """
         Initialize Tavily search
         
         Args:
             api_key: Tavily API key (from environment if not provided)
             timeout: Request timeout in seconds
+            session: Shared HTTP session so connections are kept alive across searches
         """
         # ✅ Try to get API key from parameter, then environment
         self.api_key = api_key or os.getenv('TAVILY_API_KEY')
         self.timeout = timeout
+        self.session = session or requests.Session()
         self.base_url = 'https://api.tavily.com/search'
         
         if self.api_key:
@@ -46,7 +154,13 @@ class TavilySearchIntegration:
         else:
             logger.warning(f"🔍 Tavily API initialized: ⚠️ No API key")
     
-    def search(self, query: str, max_results: int = 5, include_answer: bool = True) -> List[Dict[str, Any]]:
+    def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        include_answer: bool = True,
+        include_raw_content: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Search using Tavily API
         
@@ -54,6 +168,7 @@ class TavilySearchIntegration:
             query: Search query
             max_results: Maximum results to return
             include_answer: Include direct answer if available
+            include_raw_content: Also return each page's full text (much larger responses)
             
         Returns:
             List of search results
@@ -70,18 +185,18 @@ class TavilySearchIntegration:
                 'query': query,
                 'max_results': max_results,
                 'include_answer': include_answer,
-                'include_raw_content': True,
+                'include_raw_content': include_raw_content,
                 'topic': 'general'
             }
             
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 json=payload,
                 timeout=self.timeout
             )
             
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             
             results = []
             
@@ -101,7 +216,7 @@ class TavilySearchIntegration:
                     'title': result.get('title', 'No title'),
                     'url': result.get('url', ''),
                     'snippet': result.get('snippet', ''),
-                    'raw_content': result.get('raw_content', ''),
+                    'raw_content': result.get('raw_content') or '',
                     'source': 'Tavily',
                     'type': 'web'
                 }
@@ -114,10 +229,10 @@ class TavilySearchIntegration:
             
             return results
             
-        except requests.Timeout:
+        except _TIMEOUT_ERRORS:
             logger.warning(f"⚠️ Tavily timeout")
             return []
-        except requests.ConnectionError:
+        except _CONNECTION_ERRORS:
             logger.warning(f"⚠️ Tavily connection error")
             return []
         except Exception as e:
@@ -130,24 +245,79 @@ class WebSearchEnhanced:
     Enhanced web search with Tavily as primary backend
     
     Chain: Tavily → Wikipedia → ArXiv → Google API → Bing API → Mock
+    (Wikipedia and ArXiv are hedged in concurrently when Tavily is slow or thin)
     """
     
-    def __init__(self, max_results: int = 5, timeout: int = 15):
+    # Tags whose text never belongs in extracted page content
+    _STRIP_TAGS = ('script', 'style', 'nav', 'footer', 'meta', 'noscript')
+    _STRIP_XPATH = '|'.join(f'//{tag}' for tag in _STRIP_TAGS)
+    
+    # Requests per minute allowed for each backend before it is skipped
+    _RATE_LIMITS = {
+        'tavily': 60,
+        'wikipedia': 200,
+        'arxiv': 20,
+        'google': 60,
+        'bing': 60
+    }
+    
+    # Seconds Tavily runs alone before the Wikipedia/ArXiv fallbacks are hedged in
+    _HEDGE_DELAY = 1.0
+    
+    # Page bytes read before extraction; plenty for 3000 chars of visible text
+    _MAX_PAGE_BYTES = 200_000
+    
+    def __init__(
+        self,
+        max_results: int = 5,
+        timeout: int = 15,
+        session: Optional[requests.Session] = None,
+        cache_dir: Optional[str] = None
+    ):
         """
         Initialize enhanced web search
         
         Args:
             max_results: Maximum results per search
             timeout: Request timeout in seconds
+            session: HTTP session to reuse (a pooled one is created if omitted)
+            cache_dir: Directory to persist search results and page content across restarts
         """
         self.max_results = max_results
         self.timeout = timeout
         
+        # Extracted page text keyed by URL, shared across queries whose results overlap
+        self._content_cache = TTLCache(
+            maxsize=1024,
+            ttl=24 * 3600,
+            path=os.path.join(cache_dir, 'page_content') if cache_dir else None
+        )
+        
+        # Backend results keyed by query + limit, so repeat questions skip the APIs
+        self._search_cache = TTLCache(
+            maxsize=512,
+            ttl=3600,
+            path=os.path.join(cache_dir, 'search_results') if cache_dir else None
+        )
+        
         # Create session with connection pooling
-        self.session = self._create_session()
+        self.session = session or self._create_session()
+        
+        # Per-backend quotas; an exhausted backend is skipped instead of slept on
+        self._rate_limits = {
+            name: TokenBucket(rate=per_minute, per=60.0)
+            for name, per_minute in self._RATE_LIMITS.items()
+        }
+        
+        # Searches currently running, so identical concurrent queries share one
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Workers for racing the primary backends and fetching pages
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
         
-        # Initialize Tavily
-        self.tavily = TavilySearchIntegration(timeout=timeout)
+        # Initialize Tavily (shares the pooled session, so its TLS connection is reused)
+        self.tavily = TavilySearchIntegration(timeout=timeout, session=self.session)
         
         # API keys (optional)
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
@@ -161,10 +331,34 @@ class WebSearchEnhanced:
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         ]
         
+        # One prebuilt header dict per user agent; _get_headers just picks one
+        self._header_variants = tuple(
+            {'User-Agent': ua, **_STATIC_HEADERS} for ua in self.user_agents
+        )
+        
         logger.info("✅ Enhanced Web Search initialized")
     
-    def _create_session(self) -> requests.Session:
-        """Create session with retry strategy"""
+    def _create_session(self):
+        """
+        Create a pooled HTTP client
+        
+        Uses an HTTP/2 httpx client when httpx and h2 are installed, so
+        concurrent requests to the same host share one connection; otherwise
+        a requests session with a retry strategy.
+        """
+        if httpx is not None:
+            # The inner transport retries connection failures, the wrapper
+            # retries 429/5xx responses like the requests Retry strategy
+            return httpx.Client(
+                timeout=self.timeout,
+                follow_redirects=True,
+                transport=_StatusRetryTransport(httpx.HTTPTransport(
+                    http2=True,
+                    retries=3,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+                ))
+            )
+        
         session = requests.Session()
         retry_strategy = Retry(
             total=3,
@@ -172,29 +366,45 @@ class WebSearchEnhanced:
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
             backoff_factor=1.0
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
+        # Sized for the parallel backend race and page fetches; never block on
+        # an exhausted pool (extra connections are just not kept alive)
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=32,
+            pool_maxsize=64,
+            pool_block=False
+        )
         session.mount('http://', adapter)
         session.mount('https://', adapter)
         return session
     
     def _get_headers(self) -> Dict[str, str]:
-        """Get random user agent headers"""
-        return {
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
+        """Get random user agent headers (shared dict, copy before modifying)"""
+        return self._header_variants[random.randrange(len(self._header_variants))]
+    
+    def _rate_limited(self, backend: str) -> bool:
+        """Consume a request token for backend; True means skip this call"""
+        if self._rate_limits[backend].try_acquire():
+            return False
+        logger.warning(f"⚠️ {backend} rate limit reached, skipping")
+        return True
     
-    def search_tavily(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+    def search_tavily(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        include_raw_content: bool = False
+    ) -> List[Dict[str, Any]]:
         """Search using Tavily API (PRIMARY)"""
+        if self._rate_limited('tavily'):
+            return []
         results_limit = max_results or self.max_results
-        return self.tavily.search(query, max_results=results_limit)
+        return self.tavily.search(query, max_results=results_limit, include_raw_content=include_raw_content)
     
     def search_wikipedia(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
         """Search Wikipedia API"""
+        if self._rate_limited('wikipedia'):
+            return []
         try:
             results_limit = max_results or self.max_results
             logger.info(f"🔍 [1/6] Wikipedia: {query}")
@@ -214,7 +424,7 @@ class WebSearchEnhanced:
             )
             
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             search_results = data.get('query', {}).get('search', [])
             
             results = []
@@ -222,7 +432,7 @@ class WebSearchEnhanced:
                 formatted_result = {
                     'title': result.get('title', 'No title'),
                     'url': f"https://en.wikipedia.org/wiki/{result.get('title', '').replace(' ', '_')}",
-                    'snippet': result.get('snippet', '').replace('<span class="searchmatch">', '').replace('</span>', ''),
+                    'snippet': _SEARCHMATCH_RE.sub('', result.get('snippet', '')),
                     'source': 'Wikipedia'
                 }
                 results.append(formatted_result)
@@ -239,6 +449,8 @@ class WebSearchEnhanced:
     
     def search_arxiv(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
         """Search ArXiv API"""
+        if self._rate_limited('arxiv'):
+            return []
         try:
             results_limit = max_results or self.max_results
             logger.info(f"🔍 [2/6] ArXiv: {query}")
@@ -256,15 +468,13 @@ class WebSearchEnhanced:
             )
             
             response.raise_for_status()
-            root = ET.fromstring(response.content)
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
             
             results = []
-            for entry in root.findall('atom:entry', ns):
+            for entry in self._iter_atom_entries(response.content):
                 try:
-                    title_elem = entry.find('atom:title', ns)
-                    summary_elem = entry.find('atom:summary', ns)
-                    id_elem = entry.find('atom:id', ns)
+                    title_elem = entry.find(f'{_ATOM_NS}title')
+                    summary_elem = entry.find(f'{_ATOM_NS}summary')
+                    id_elem = entry.find(f'{_ATOM_NS}id')
                     
                     if title_elem is not None:
                         result = {
@@ -274,6 +484,8 @@ class WebSearchEnhanced:
                             'source': 'ArXiv'
                         }
                         results.append(result)
+                        if len(results) >= results_limit:
+                            break
                 except:
                     continue
             
@@ -287,10 +499,33 @@ class WebSearchEnhanced:
             logger.warning(f"⚠️ ArXiv failed: {e}")
             return []
     
+    def _iter_atom_entries(self, content: bytes) -> Iterator[Any]:
+        """
+        Stream <entry> elements out of an Atom feed
+        
+        Uses lxml's C parser when installed, otherwise the stdlib one. Each
+        entry is cleared once the caller moves on, so the full tree is never
+        kept in memory.
+        """
+        entry_tag = f'{_ATOM_NS}entry'
+        try:
+            from lxml import etree
+            context = etree.iterparse(io.BytesIO(content), events=('end',), tag=entry_tag)
+        except ImportError:
+            from xml.etree import ElementTree as etree
+            context = etree.iterparse(io.BytesIO(content), events=('end',))
+        
+        for _, elem in context:
+            if elem.tag == entry_tag:
+                yield elem
+                elem.clear()
+    
     def search_google_api(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
         """Search using Google Custom Search API"""
         if not self.google_api_key or not self.google_search_engine_id:
             return []
+        if self._rate_limited('google'):
+            return []
         
         try:
             results_limit = max_results or self.max_results
@@ -308,7 +543,7 @@ class WebSearchEnhanced:
             )
             
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             
             results = []
             for item in data.get('items', [])[:results_limit]:
@@ -334,13 +569,14 @@ class WebSearchEnhanced:
         """Search using Bing Search API"""
         if not self.bing_api_key:
             return []
+        if self._rate_limited('bing'):
+            return []
         
         try:
             results_limit = max_results or self.max_results
             logger.info(f"🔍 [4/6] Bing API: {query}")
             
-            headers = self._get_headers()
-            headers['Ocp-Apim-Subscription-Key'] = self.bing_api_key
+            headers = {**self._get_headers(), 'Ocp-Apim-Subscription-Key': self.bing_api_key}
             
             response = self.session.get(
                 'https://api.bing.microsoft.com/v7.0/search',
@@ -355,7 +591,7 @@ class WebSearchEnhanced:
             )
             
             response.raise_for_status()
-            data = response.json()
+            data = _json_loads(response.content)
             
             results = []
             for item in data.get('webPages', {}).get('value', [])[:results_limit]:
@@ -382,18 +618,20 @@ class WebSearchEnhanced:
         logger.warning(f"⚠️ [5/6] MOCK: All searches failed, using mock results")
         
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        current_date = datetime.now().strftime("%B %d, %Y")
+        current_date = today()
+        encoded_query = quote_plus(query)
+        results_url, related_url = (template.format(q=encoded_query) for template in _MOCK_URL_TEMPLATES)
         
         mock_results = [
             {
                 'title': f'Information about {query}',
-                'url': f'https://local.search/results?q={query.replace(" ", "+")}',
+                'url': results_url,
                 'snippet': f'Based on available knowledge about {query} as of {current_date}. This is a local cached result.',
                 'source': 'Local Cache'
             },
             {
                 'title': f'Related: {query.title()} Overview',
-                'url': f'https://local.search/related?q={query.replace(" ", "+")}',
+                'url': related_url,
                 'snippet': f'General information and context related to {query}. Updated: {current_time}.',
                 'source': 'Local Cache'
             }
@@ -402,76 +640,176 @@ class WebSearchEnhanced:
         logger.info(f"✅ MOCK SUCCESS: {len(mock_results)} results")
         return mock_results
     
-    def search(self, query: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+    def search(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        include_raw_content: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Main search with complete fallback chain
         
         Chain: Tavily → Wikipedia → ArXiv → Google API → Bing API → Mock
+        Wikipedia and ArXiv are hedged in concurrently when Tavily is slow or
+        thin; results are still taken in that priority order
         
         GUARANTEED to return results
         
         Args:
             query: Search query
             max_results: Override max results
+            include_raw_content: Ask Tavily for full page text ('raw_content')
             
         Returns:
             List of search results (never empty)
         """
         logger.info(f"\n🔄 STARTING ENHANCED SEARCH: {query}")
-        logger.info(f"Fallback chain: Tavily → Wikipedia → ArXiv → Google API → Bing API → Mock")
+        logger.info(f"Fallback chain: Tavily (→ Wikipedia | ArXiv) → Google API → Bing API → Mock")
         
         results_limit = max_results or self.max_results
         
-        # Level 0: Tavily (PRIMARY)
-        try:
-            results = self.search_tavily(query, results_limit)
-            if results:
-                return results
-        except Exception as e:
-            logger.debug(f"Tavily exception: {e}")
+        key = hashlib.blake2b(
+            f"{query}|{results_limit}|{int(include_raw_content)}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            logger.info(f"⚡ Cached search: {query[:50]}")
+            return [dict(result) for result in cached]
         
-        time.sleep(0.2)
+        # Singleflight: a duplicate of a running search waits for its result.
+        # The cache is checked again under the lock: a leader stores its
+        # result before leaving the in-flight map, so a search that finished
+        # after the first lookup is found here instead of being repeated
+        with self._inflight_lock:
+            cached = self._search_cache.get(key)
+            future = self._inflight.get(key)
+            is_leader = cached is None and future is None
+            if is_leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
         
-        # Level 1: Wikipedia
-        try:
-            results = self.search_wikipedia(query, results_limit)
-            if results:
-                return results
-        except Exception as e:
-            logger.debug(f"Wikipedia exception: {e}")
+        if cached is not None:
+            logger.info(f"⚡ Cached search: {query[:50]}")
+            return [dict(result) for result in cached]
         
-        time.sleep(0.2)
+        if not is_leader:
+            logger.info(f"⏳ Joining in-flight search: {query[:50]}")
+            return [dict(result) for result in future.result()]
         
-        # Level 2: ArXiv
         try:
-            results = self.search_arxiv(query, results_limit)
+            results = self._search_backends(query, results_limit, include_raw_content)
             if results:
-                return results
-        except Exception as e:
-            logger.debug(f"ArXiv exception: {e}")
+                # Share copies: callers such as search_and_extract mutate the dicts
+                snapshot = [dict(result) for result in results]
+                self._search_cache.set(key, snapshot)
+            else:
+                # Level 5: Mock (Always succeeds, never cached)
+                results = self.search_mock(query)
+                snapshot = [dict(result) for result in results]
+            future.set_result(snapshot)
+            return results
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _search_backends(
+        self,
+        query: str,
+        results_limit: int,
+        include_raw_content: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Run the real backends (levels 0-4) of the fallback chain
         
-        time.sleep(0.2)
+        Wikipedia and ArXiv are only queried when Tavily comes back thin or
+        empty, or has not answered within _HEDGE_DELAY seconds.
+        Backends are consulted in priority order. The first non-empty result
+        is returned as-is unless it is thin (fewer than
+        max(2, results_limit // 2) results), in which case the next backends'
+        results are merged in, deduplicated by URL, until there are enough.
+        
+        Args:
+            query: Search query
+            results_limit: Maximum results per backend
+            include_raw_content: Ask Tavily for full page text
+            
+        Returns:
+            Result list, or None if every backend failed
+        """
+        enough = min(results_limit, max(2, results_limit // 2))
         
-        # Level 3: Google API
+        # Level 0: Tavily gets a head start of _HEDGE_DELAY seconds
+        tavily = self._executor.submit(
+            self.search_tavily, query, results_limit, include_raw_content
+        )
+        futures = [('Tavily', tavily)]
         try:
-            results = self.search_google_api(query, results_limit)
-            if results:
-                return results
-        except Exception as e:
-            logger.debug(f"Google API exception: {e}")
+            hedge = len(tavily.result(timeout=self._HEDGE_DELAY) or ()) < enough
+        except Exception:
+            # Still running (TimeoutError) or failed
+            hedge = True
+        
+        # Levels 1-2: only when Tavily is slow, thin or empty, Wikipedia and
+        # ArXiv run concurrently with it, so a fallback (or a merge) costs
+        # max(latencies) instead of the sum
+        if hedge:
+            futures += [
+                (name, self._executor.submit(backend, query, results_limit))
+                for name, backend in (
+                    ('Wikipedia', self.search_wikipedia),
+                    ('ArXiv', self.search_arxiv)
+                )
+            ]
+        backends = [(name, future.result) for name, future in futures]
         
-        time.sleep(0.2)
+        # Levels 3-4: paid APIs, only called if still needed
+        backends.append(('Google API', lambda: self.search_google_api(query, results_limit)))
+        backends.append(('Bing API', lambda: self.search_bing_api(query, results_limit)))
         
-        # Level 4: Bing API
+        merged = None
         try:
-            results = self.search_bing_api(query, results_limit)
-            if results:
-                return results
-        except Exception as e:
-            logger.debug(f"Bing API exception: {e}")
+            for name, fetch in backends:
+                try:
+                    results = fetch()
+                except Exception as e:
+                    logger.debug(f"{name} exception: {e}")
+                    continue
+                if not results:
+                    continue
+                
+                if merged is None:
+                    merged = results
+                else:
+                    logger.info(f"➕ Thin results, merging in {name}")
+                    merged = self._dedupe_by_url(merged + results)[:results_limit]
+                
+                if len(merged) >= enough:
+                    break
+        finally:
+            # Drop lower-priority searches that haven't started yet (ones
+            # already running finish in the background and are ignored)
+            for _, future in futures:
+                future.cancel()
         
-        # Level 5: Mock (Always succeeds)
-        return self.search_mock(query)
+        return merged
+    
+    @staticmethod
+    def _dedupe_by_url(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the first result per URL (results without a URL are all kept)"""
+        seen = set()
+        unique = []
+        for result in results:
+            url = result.get('url')
+            if url:
+                if url in seen:
+                    continue
+                seen.add(url)
+            unique.append(result)
+        return unique
     
     def fetch_page_content(self, url: str) -> Optional[str]:
         """Fetch and extract text content from a webpage"""
@@ -479,61 +817,167 @@ class WebSearchEnhanced:
             if not url or not url.startswith('http'):
                 return None
             
-            logger.info(f"📄 Fetching: {url[:50]}")
-            
-            response = self.session.get(
-                url,
-                headers=self._get_headers(),
-                timeout=self.timeout,
-                allow_redirects=True
-            )
+            cached = self._content_cache.get(url)
+            if cached is not None:
+                logger.info(f"⚡ Cached content: {url[:50]}")
+                return cached
             
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            logger.info(f"📄 Fetching: {url[:50]}")
             
-            for script in soup(["script", "style", "nav", "footer", "meta"]):
-                script.decompose()
+            body, final_url = self._download_capped(url)
+            content = self._extract_text(body)[:3000]
+            logger.info(f"✅ Extracted {len(content)} characters")
             
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split(" "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
+            if content:
+                # Store under the final URL too, so redirect targets are shared
+                self._content_cache.set(url, content)
+                if final_url != url:
+                    self._content_cache.set(final_url, content)
             
-            content = text[:3000]
-            logger.info(f"✅ Extracted {len(content)} characters")
             return content if content else None
             
         except Exception as e:
             logger.debug(f"Content fetch failed: {e}")
             return None
     
+    def _download_capped(self, url: str) -> Tuple[bytes, str]:
+        """
+        Stream a page, stopping after _MAX_PAGE_BYTES
+        
+        Args:
+            url: Page URL
+            
+        Returns:
+            Tuple of (body bytes, final URL after redirects)
+        """
+        headers = self._get_headers()
+        if httpx is not None and isinstance(self.session, httpx.Client):
+            with self.session.stream('GET', url, headers=headers, timeout=self.timeout) as response:
+                response.raise_for_status()
+                return self._read_capped(response.iter_bytes(32768)), str(response.url)
+        
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            return self._read_capped(response.iter_content(32768)), response.url
+    
+    def _read_capped(self, chunks: Iterable[bytes]) -> bytes:
+        """Join body chunks until _MAX_PAGE_BYTES have been read"""
+        parts = []
+        total = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            total += len(chunk)
+            if total >= self._MAX_PAGE_BYTES:
+                break
+        return b''.join(parts)
+    
+    def _extract_text(self, html: bytes) -> str:
+        """
+        Extract visible page text with whitespace collapsed
+        
+        Uses selectolax when installed (much faster than html.parser),
+        then lxml, otherwise BeautifulSoup.
+        """
+        if HTMLParser is not None:
+            tree = HTMLParser(html)
+            tree.strip_tags(list(self._STRIP_TAGS))  # selectolax rejects tuples
+            text = tree.body.text(separator=' ', strip=True) if tree.body else ''
+            return ' '.join(text.split())
+        
+        # lxml is only a fallback, so it is not imported unless reached
+        try:
+            from lxml import html as lxml_html
+        except ImportError:
+            pass
+        else:
+            doc = lxml_html.fromstring(html)
+            # One XPath traversal finds every unwanted tag type
+            for element in doc.xpath(self._STRIP_XPATH):
+                element.drop_tree()
+            return ' '.join(doc.text_content().split())
+        
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        for script in soup(list(self._STRIP_TAGS)):
+            script.decompose()
+        
+        text = soup.get_text()
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split(" "))
+        return ' '.join(chunk for chunk in chunks if chunk)
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        max_results: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches concurrently
+        
+        Duplicate queries are searched once. Each query goes through search(),
+        so the result cache and in-flight coalescing still apply.
+        
+        Args:
+            queries: Search queries
+            max_results: Override max results
+        
+        Returns:
+            One result list per query, in input order
+        """
+        unique = list(dict.fromkeys(queries))
+        if not unique:
+            return []
+        
+        logger.info(f"🔄 Batch search: {len(unique)} unique of {len(queries)} queries")
+        
+        # A separate pool: search() itself waits on tasks in self._executor
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(unique), 4)) as pool:
+            by_query = dict(zip(unique, pool.map(lambda q: self.search(q, max_results), unique)))
+        
+        # Duplicates get their own copies, since callers may mutate the dicts
+        results = []
+        seen = set()
+        for query in queries:
+            if query in seen:
+                results.append([dict(result) for result in by_query[query]])
+            else:
+                seen.add(query)
+                results.append(by_query[query])
+        return results
+    
     def search_and_extract(self, query: str, fetch_content: bool = False) -> List[Dict[str, Any]]:
         """Search and optionally extract full content"""
         logger.info(f"🔍 Searching{' + extracting' if fetch_content else ''}...")
         
-        results = self.search(query)
+        # Tavily can return page text with the results, saving a fetch per page
+        results = self.search(query, include_raw_content=fetch_content)
         
         if not results or not fetch_content:
             return results
         
         logger.info(f"📄 Fetching full content for {len(results)} results")
         
-        for i, result in enumerate(results):
+        # Fetch all pages in parallel; 429/5xx backoff is left to the session's retries
+        futures = {}
+        for result in results:
             url = result.get('url')
-            if url and url.startswith('http'):
-                try:
-                    content = self.fetch_page_content(url)
-                    if content:
-                        result['full_content'] = content
-                    else:
-                        result['full_content'] = result.get('snippet', '')
-                    time.sleep(0.2)
-                except Exception as e:
-                    logger.debug(f"Content extraction error: {e}")
-                    result['full_content'] = result.get('snippet', '')
+            raw_content = result.get('raw_content')
+            if raw_content:
+                result['full_content'] = ' '.join(raw_content.split())[:3000]
+            elif url and url.startswith('http'):
+                futures[self._executor.submit(self.fetch_page_content, url)] = result
             else:
                 result['full_content'] = result.get('snippet', '')
         
+        for future in concurrent.futures.as_completed(futures):
+            result = futures[future]
+            try:
+                result['full_content'] = future.result() or result.get('snippet', '')
+            except Exception as e:
+                logger.debug(f"Content extraction error: {e}")
+                result['full_content'] = result.get('snippet', '')
+        
         return results
     
     def format_results_for_context(self, results: List[Dict[str, Any]]) -> str:
@@ -541,8 +985,9 @@ class WebSearchEnhanced:
         if not results:
             return "No search results available."
         
-        current_date = datetime.now().strftime('%B %d, %Y')
-        context = f"=== WEB SEARCH RESULTS (As of {current_date}) ===\n\n"
+        current_date = today()
+        parts = [f"=== WEB SEARCH RESULTS (As of {current_date}) ===\n\n"]
+        append = parts.append
         
         for i, result in enumerate(results, 1):
             title = result.get('title', 'No title')
@@ -553,22 +998,18 @@ class WebSearchEnhanced:
             
             content = full_content if full_content else snippet
             
-            context += f"[Result {i}]\n"
-            context += f"Title: {title}\n"
-            context += f"Source: {source}\n"
+            append(f"[Result {i}]\nTitle: {title}\nSource: {source}\n")
             
             if url:
-                context += f"URL: {url}\n"
+                append(f"URL: {url}\n")
             
             if content:
-                context += f"Content: {content[:400]}\n"
+                append(f"Content: {content[:400]}\n\n")
             else:
-                context += f"Content: [No content available]\n"
-            
-            context += "\n"
+                append("Content: [No content available]\n\n")
         
         logger.info(f"✅ Formatted {len(results)} results")
-        return context
+        return ''.join(parts)
 
 
 class HybridSearchEnhanced: